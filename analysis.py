@@ -0,0 +1,227 @@
+# The /api/github analysis pipeline: metadata, issue series, pull and branch activity, forecasts.
+#
+# Concurrent analyses of the same repository with the same options are coalesced, so a popular
+# repository on the dashboard costs one harvest and one set of forecasts however many clients
+# ask for it at once. The pipeline can also be consumed part by part (`iter_analysis`) to stream
+# results to the client as they become ready, and several repositories can be analysed in one
+# bulk request on a process-wide pool (`iter_bulk_analysis`). Streams replay a fresh cached
+# response as parts; otherwise they run their own pipeline (they are not coalesced, since
+# their parts are sent as they happen) and cache the result for the next request.
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+
+import http_client
+import metrics
+from settings import GITHUB_API_BASE, BULK_CONCURRENCY, FORECAST_TIMEOUT, AUTO_FORECAST_TIMEOUT
+from issue_store import sync_repo_issues
+from issue_search import analysis_start
+from aggregation import aggregate_issues, bucket_range
+from repo_activity import retrieve_pull_requests, list_repo_branches
+from forecasts import iter_forecasts, issue_forecast_jobs
+from local_forecast import local_forecasts
+from singleflight import SingleFlight
+from response_cache import analysis_cache, cache_key
+
+analysis_flight = SingleFlight()
+# Shared by every bulk request, so the number of repositories analysed at once stays bounded
+_bulk_pool = ThreadPoolExecutor(max_workers=BULK_CONCURRENCY, thread_name_prefix="bulk")
+
+
+# Response fields filled by the forecast stage, in the order they are dispatched
+FORECAST_FIELDS = ("createdAtImageUrls", "closedAtImageUrls", "pullsForecastImageUrls", "branchesForecastImageUrls")
+
+
+class AnalysisError(Exception):
+    """The analysis could not run; carries the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def fetch_repository_info(repo_full_name):
+    """Fetch the repository metadata the analysis starts from."""
+    repo_metadata_url = f"{GITHUB_API_BASE}repos/{repo_full_name}"
+    with metrics.stage("metadata"):
+        repo_response = http_client.get(repo_metadata_url)
+
+    if repo_response.status_code != 200:
+        raise AnalysisError("Failed to fetch repository metadata")
+    return repo_response.json()
+
+
+def fetch_activity(repo_full_name):
+    """Fetch Pull Requests and Branches."""
+    with metrics.stage("activity"):
+        return retrieve_pull_requests(repo_full_name), list_repo_branches(repo_full_name)
+
+
+def iter_analysis(repo_full_name, repository_info, granularity="monthly", refresh=False, engine="remote",
+                  failed_forecasts=None):
+    """Run the pipeline stage by stage, yielding `(part, data)` as soon as each part is ready.
+
+    Parts are "repository" and "series" (dicts of response fields), with the "local" or "auto"
+    forecast engine a "localForecasts" part (see `local_forecast.local_forecasts`), then one part
+    per forecast field as its remote forecast completes. The "local" engine skips the LSTM
+    service and reports its forecast fields as None; "auto" gives it AUTO_FORECAST_TIMEOUT.
+    Forecast fields whose LSTM call failed or timed out are appended to `failed_forecasts`.
+    The "series" part lists the months whose issue search failed as "incompleteMonths"; when
+    none could be harvested, `AnalysisError` (503) is raised instead.
+    """
+    yield "repository", {
+        "starCount": repository_info.get("stargazers_count", 0),
+        "forkCount": repository_info.get("forks_count", 0)
+    }
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        # Pulls and branches are fetched while the issues are harvested
+        activity = pool.submit(metrics.in_context(fetch_activity), repo_full_name)
+
+        # Fetch Issues: only months not yet in the local store are searched again,
+        # refresh drops the stored issues first
+        with metrics.stage("issues"):
+            issues_data, incomplete_months = sync_repo_issues(repo_full_name, refresh=refresh)
+        if len(incomplete_months) == len(bucket_range(analysis_start(), date.today(), "monthly")):
+            raise AnalysisError("Failed to fetch repository issues", 503)
+
+        # Created and closed counts per bucket, zero-filled over the whole analysis range; months
+        # whose search failed are listed so their zeros are not taken for real counts
+        with metrics.stage("aggregate"):
+            issue_counts = aggregate_issues(issues_data, granularity, start=analysis_start(), end=date.today())
+        yield "series", {"created": issue_counts["created"], "closed": issue_counts["closed"],
+                         "incompleteMonths": incomplete_months}
+
+        with metrics.stage("activity-wait"):
+            pulls_info, branches_info = activity.result()
+
+    if engine != "remote":
+        with metrics.stage("local-forecasts"):
+            forecasts = local_forecasts(repo_full_name, issues_data, pulls_info, branches_info, analysis_start())
+        yield "localForecasts", {"localForecasts": forecasts}
+    if engine == "local":
+        for field in FORECAST_FIELDS:
+            yield field, None
+        return
+
+    # Prepare LSTM Microservice payloads and run the forecasts concurrently
+    repo_name = repo_full_name.split("/")[1]
+    forecast_jobs = issue_forecast_jobs(issues_data, repo_name)
+    if pulls_info:
+        forecast_jobs["pullsForecastImageUrls"] = ("/api/forecast/pulls", {"pulls": pulls_info, "repo": repo_name})
+    if branches_info:
+        forecast_jobs["branchesForecastImageUrls"] = ("/api/forecast/branches", {"branches": branches_info, "repo": repo_name})
+
+    with metrics.stage("forecasts"):
+        for field, forecast in iter_forecasts(forecast_jobs, AUTO_FORECAST_TIMEOUT if engine == "auto" else FORECAST_TIMEOUT):
+            if forecast is None and failed_forecasts is not None:
+                failed_forecasts.append(field)
+            yield field, forecast
+    for field in FORECAST_FIELDS:
+        if field not in forecast_jobs:
+            yield field, None
+
+
+def add_part(result, part, data):
+    """Merge one `iter_analysis` part into the /api/github response body."""
+    if part in FORECAST_FIELDS:
+        result[part] = data
+    else:
+        result.update(data)
+
+
+def analysis_parts(result):
+    """Split a /api/github response body back into the parts `iter_analysis` yields."""
+    yield "repository", {"starCount": result.get("starCount", 0), "forkCount": result.get("forkCount", 0)}
+    yield "series", {key: result[key] for key in ("created", "closed", "incompleteMonths") if key in result}
+    if "localForecasts" in result:
+        yield "localForecasts", {"localForecasts": result["localForecasts"]}
+    for field in FORECAST_FIELDS:
+        yield field, result.get(field)
+
+
+def run_analysis(repo_full_name, granularity="monthly", refresh=False, engine="remote"):
+    """Run the full pipeline for one repository.
+
+    Returns `(response body, failed forecast fields)`; the body of an analysis whose forecasts
+    failed is still complete otherwise, with those fields None.
+    """
+    repository_info = fetch_repository_info(repo_full_name)
+    result, failed_forecasts = {}, []
+    for part, data in iter_analysis(repo_full_name, repository_info, granularity, refresh, engine, failed_forecasts):
+        add_part(result, part, data)
+    return result, failed_forecasts
+
+
+def cached_analysis_parts(repo_full_name, granularity="monthly", engine="remote"):
+    """Parts of a fresh cached analysis, or None when there is none (stale entries are not replayed)."""
+    result = analysis_cache.peek(cache_key(repo_full_name, granularity=granularity, forecast=engine))
+    return analysis_parts(result) if result is not None else None
+
+
+def iter_cached_analysis(repo_full_name, repository_info, granularity="monthly", refresh=False, engine="remote"):
+    """Like `iter_analysis`, then cache the assembled response if it is complete.
+
+    The response is only stored once the last part has been sent, so an interrupted stream
+    stores nothing.
+    """
+    result, failed_forecasts = {}, []
+    for part, data in iter_analysis(repo_full_name, repository_info, granularity, refresh, engine, failed_forecasts):
+        add_part(result, part, data)
+        yield part, data
+    if not failed_forecasts and not result.get("incompleteMonths"):
+        analysis_cache.store(cache_key(repo_full_name, granularity=granularity, forecast=engine), result)
+
+
+def analyze_repository(repo_full_name, granularity="monthly", refresh=False, engine="remote"):
+    """Run or join the analysis of a repository; returns `((result, failed forecast fields), coalesced)`."""
+    key = (repo_full_name.lower(), granularity, refresh, engine)
+    return analysis_flight.do(key, lambda: run_analysis(repo_full_name, granularity, refresh, engine))
+
+
+def cached_analysis(repo_full_name, granularity="monthly", refresh=False, engine="remote"):
+    """Serve the analysis from the response cache; returns `(result, cache_status, coalesced)`.
+
+    A refresh recomputes the analysis and replaces the cached response. Results with failed
+    forecasts or incomplete issue months are returned but not cached, so the LSTM service and
+    the issue search are asked again next time.
+    """
+    coalesced, failed = [], []
+
+    def is_complete(result):
+        return not failed and not result.get("incompleteMonths")
+
+    def compute():
+        (result, failed_forecasts), shared = analyze_repository(repo_full_name, granularity, refresh, engine)
+        coalesced.append(shared)
+        failed.extend(failed_forecasts)
+        return result
+
+    key = cache_key(repo_full_name, granularity=granularity, forecast=engine)
+    result, cache_status = analysis_cache.fetch(key, compute, bypass=refresh, cacheable=is_complete)
+    return result, cache_status, bool(coalesced and coalesced[0])
+
+
+def bulk_entry(repo_full_name, granularity="monthly", refresh=False, engine="remote"):
+    """Analyse one repository of a bulk request; failures are reported in the entry instead of raised."""
+    try:
+        result, cache_status, coalesced = cached_analysis(repo_full_name, granularity, refresh=refresh, engine=engine)
+    except AnalysisError as error:
+        return {"repository": repo_full_name, "status": error.status, "error": error.message}
+    except Exception as error:
+        print(f"Bulk analysis of {repo_full_name} failed: {error!r}")
+        return {"repository": repo_full_name, "status": 502, "error": "Analysis failed"}
+    return {"repository": repo_full_name, "status": 200, "cache": cache_status, "coalesced": coalesced,
+            "result": result}
+
+
+def iter_bulk_analysis(repositories, granularity="monthly", refresh=False, engine="remote"):
+    """Analyse several repositories on the shared bulk pool, yielding each entry as it completes.
+
+    Every repository goes through `cached_analysis`, so bulk requests share the response cache,
+    coalescing, issue store, connection pools and rate-limit scheduler with single analyses.
+    """
+    futures = [_bulk_pool.submit(metrics.in_context(bulk_entry), repo, granularity, refresh, engine)
+               for repo in repositories]
+    for future in as_completed(futures):
+        yield future.result()
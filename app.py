@@ -280,7 +280,7 @@
 #     print("branches_data", branches_data)
 #     if branches_data:
 #         branches_body = { "branches": branches_data, "repo": repo_name.split("/")[1] }
-#         branches_response = requests.post(LSTM_API_URL_BRANCHES, json=branches_body, headers={'content-type': 'application/json'})
+#         branches_response = requests.post(LSTM_API_URL_BRANCHES, json=branches_body)
         
 #         if branches_response.status_code == 200:
 #             branches_forecast_json = branches_response.json()
@@ -430,22 +430,35 @@
 #     app.run(debug=True, host='0.0.0.0', port=8081)
 
 # Import standard and third-party libraries
+import time
+STARTUP_BEGAN = time.perf_counter()
+
 import os
+import re
 import json
-import requests
-import pandas as pd
-from flask import Flask, request, jsonify, make_response, Response
+from flask import Flask, request, jsonify, make_response, Response, stream_with_context
 from flask_cors import CORS
-from datetime import date
-from dateutil import relativedelta
+
+import http_client
+import metrics
+import serialization
+from aggregation import GRANULARITIES
+from settings import BULK_MAX_REPOSITORIES, FORECAST_ENGINE
+from local_forecast import FORECAST_ENGINES
+from analysis import (cached_analysis, cached_analysis_parts, analysis_flight, fetch_repository_info,
+                      iter_cached_analysis, iter_bulk_analysis, AnalysisError)
+from watchlist import watchlist
+from rate_limit import scheduler
+from response_cache import analysis_cache
+from lstm_client import lstm
+from forecast_cache import forecast_cache
 
 # Initialize the Flask application
 app = Flask(__name__)
 CORS(app)
-
-# Constants
-GITHUB_API_BASE = "https://api.github.com/"
-DEFAULT_PER_PAGE = 100
+# Metrics first so their timing covers the compression hook as well
+metrics.init_app(app)
+serialization.init_app(app)
 
 
 def prepare_cors_response():
@@ -464,187 +477,184 @@ def add_cors_headers(response):
     return response
 
 
-def retrieve_pull_requests(repository_name):
-    """Fetch pull requests related to the specified GitHub repository."""
-    token = os.getenv('GITHUB_TOKEN', 'GITHUB_TOKEN')
-    headers = {"Authorization": f'token {token}'}
-    pulls_api_url = f"{GITHUB_API_BASE}repos/{repository_name}/pulls?state=all&per_page={DEFAULT_PER_PAGE}"
-
-    response = requests.get(pulls_api_url, headers=headers)
-    pull_data = []
-
-    if response.status_code == 200:
-        for pull in response.json():
-            pull_data.append({
-                "pull_number": pull.get("number"),
-                "created_at": pull.get("created_at", "")[:10]
-            })
-    return pull_data
-
-
-def list_repo_branches(repository_name):
-    """Retrieve all branches for a given GitHub repository."""
-    token = os.getenv('GITHUB_TOKEN', 'GITHUB_TOKEN')
-    headers = {"Authorization": f'token {token}'}
-    branches_api_url = f"{GITHUB_API_BASE}repos/{repository_name}/branches"
-
-    response = requests.get(branches_api_url, headers=headers, params={"per_page": DEFAULT_PER_PAGE})
-
-    if response.status_code != 200:
-        print(f"Failed to retrieve branches for {repository_name}: {response.text}")
-        return []
-
-    branches_info = []
-    today_date = date.today().isoformat()
-
-    for branch in response.json():
-        branches_info.append({
-            "branch_name": branch.get("name"),
-            "created_at": today_date
-        })
-    return branches_info
-
-
-@app.route('/api/github', methods=['POST'])
-def analyze_github_repo():
-    payload = request.get_json()
-    repo_full_name = payload.get('repository')
+STREAM_MIMETYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
 
-    token = os.getenv('GITHUB_TOKEN', 'GITHUB_TOKEN')
-    headers = {"Authorization": f'token {token}'}
 
-    repo_metadata_url = f"{GITHUB_API_BASE}repos/{repo_full_name}"
-    repo_response = requests.get(repo_metadata_url, headers=headers)
+def requested_stream_format(payload):
+    """Streaming is opt-in through `"stream": "ndjson" | "sse"` or a matching Accept header."""
+    stream = payload.get('stream')
+    if stream in STREAM_MIMETYPES:
+        return stream
+    if stream is True:
+        return "ndjson"
+    for stream_format, mimetype in STREAM_MIMETYPES.items():
+        if request.accept_mimetypes.best == mimetype:
+            return stream_format
+    return None
 
-    if repo_response.status_code != 200:
-        return jsonify({"error": "Failed to fetch repository metadata"}), 400
 
-    repository_info = repo_response.json()
+REPOSITORY_NAME = re.compile(r"[\w.-]+/[\w.-]+")
 
-    # Fetch Issues
-    current_day = date.today()
-    issues_data = []
 
-    for _ in range(24):
-        previous_month = current_day + relativedelta.relativedelta(months=-1)
-        search_query = f"type:issue repo:{repo_full_name} created:{previous_month}..{current_day}"
-        search_url = f"{GITHUB_API_BASE}search/issues?q={search_query}&per_page={DEFAULT_PER_PAGE}"
+def valid_repository(name):
+    """A repository is named `owner/name`; "." and ".." would walk the API path instead."""
+    return (isinstance(name, str) and REPOSITORY_NAME.fullmatch(name) is not None
+            and not any(part in (".", "..") for part in name.split("/")))
 
-        issues_response = requests.get(search_url, headers=headers)
 
-        if issues_response.status_code != 200:
-            continue
+def requested_engine(payload):
+    """Forecast engine of a request: `"forecast": "remote" | "local" | "auto"`, FORECAST_ENGINE by default."""
+    return payload.get('forecast', FORECAST_ENGINE)
 
-        for issue in issues_response.json().get("items", []):
-            issues_data.append({
-                "issue_number": issue.get("number"),
-                "created_at": issue.get("created_at", "")[:10],
-                "closed_at": issue.get("closed_at", "")[:10] if issue.get("closed_at") else None,
-                "labels": [label.get("name") for label in issue.get("labels", [])],
-                "State": issue.get("state"),
-                "Author": issue.get("user", {}).get("login")
-            })
-        current_day = previous_month
 
-    issues_df = pd.DataFrame(issues_data)
+def stream_analysis(parts, stream_format):
+    """Send each analysis part as an NDJSON line or a Server-Sent Event as soon as it is ready."""
+    def encode(part, data):
+        if stream_format == "sse":
+            return f"event: {part}\ndata: {app.json.dumps(data)}\n\n"
+        return app.json.dumps({"part": part, "data": data}) + "\n"
 
-    # Grouping issues by month (created)
-    created_monthly = issues_df.groupby(pd.to_datetime(issues_df['created_at']).dt.to_period('M')).size()
-    created_data = [[str(month), count] for month, count in created_monthly.items()]
+    def generate():
+        try:
+            for part, data in parts:
+                yield encode(part, data)
+        except AnalysisError as error:
+            # The status line is already sent, so a failure mid-stream becomes a final "error" part
+            yield encode("error", {"error": error.message, "status": error.status})
+            return
+        yield encode("done", None)
 
-    # Grouping issues by month (closed)
-    closed_monthly = issues_df.dropna(subset=["closed_at"]).groupby(pd.to_datetime(issues_df['closed_at']).dt.to_period('M')).size()
-    closed_data = [[str(month), count] for month, count in closed_monthly.items()]
-
-    # Fetch Pull Requests and Branches
-    pulls_info = retrieve_pull_requests(repo_full_name)
-    branches_info = list_repo_branches(repo_full_name)
+    response = Response(stream_with_context(generate()), mimetype=STREAM_MIMETYPES[stream_format])
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
 
-    # Prepare LSTM Microservice payloads
-    lstm_api_base = "https://lstm-app-708210591622.us-central1.run.app"
 
-    created_prediction = requests.post(f"{lstm_api_base}/api/forecast", json={"issues": issues_data, "type": "created_at", "repo": repo_full_name.split("/")[1]}, headers={'content-type': 'application/json'})
-    closed_prediction = requests.post(f"{lstm_api_base}/api/forecast", json={"issues": issues_data, "type": "closed_at", "repo": repo_full_name.split("/")[1]}, headers={'content-type': 'application/json'})
+@app.route('/api/github', methods=['POST'])
+def analyze_github_repo():
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({"error": "request body must be a JSON object"}), 400
+    repo_full_name = payload.get('repository')
+    granularity = payload.get('granularity', 'monthly')
+    if not valid_repository(repo_full_name):
+        return jsonify({"error": "repository must be an owner/name string"}), 400
+    if granularity not in GRANULARITIES:
+        return jsonify({"error": f"granularity must be one of {', '.join(GRANULARITIES)}"}), 400
+    engine = requested_engine(payload)
+    if engine not in FORECAST_ENGINES:
+        return jsonify({"error": f"forecast must be one of {', '.join(FORECAST_ENGINES)}"}), 400
+
+    # "refresh": true in the request body drops the stored issues before harvesting
+    refresh = bool(payload.get('refresh'))
+    stream_format = requested_stream_format(payload)
+    if stream_format:
+        # A fresh cached response is replayed; otherwise the stream runs (and then caches) its own analysis
+        parts = None if refresh else cached_analysis_parts(repo_full_name, granularity, engine)
+        cache_status = "HIT"
+        if parts is None:
+            try:
+                repository_info = fetch_repository_info(repo_full_name)
+            except AnalysisError as error:
+                return jsonify({"error": error.message}), error.status
+            parts = iter_cached_analysis(repo_full_name, repository_info, granularity, refresh, engine)
+            cache_status = "MISS"
+        response = stream_analysis(parts, stream_format)
+        response.headers["X-Cache"] = cache_status
+        return response
+
+    try:
+        result, cache_status, coalesced = cached_analysis(repo_full_name, granularity, refresh=refresh, engine=engine)
+    except AnalysisError as error:
+        return jsonify({"error": error.message}), error.status
+
+    response = jsonify(result)
+    response.headers["X-Cache"] = cache_status.upper()
+    response.headers["X-Analysis-Coalesced"] = "true" if coalesced else "false"
+    return response
 
-    pull_forecast = None
-    if pulls_info:
-        pull_response = requests.post(f"{lstm_api_base}/api/forecast/pulls", json={"pulls": pulls_info, "repo": repo_full_name.split("/")[1]}, headers={'content-type': 'application/json'})
-        pull_forecast = pull_response.json() if pull_response.status_code == 200 else None
 
-    branch_forecast = None
-    if branches_info:
-        branch_response = requests.post(f"{lstm_api_base}/api/forecast/branches", json={"branches": branches_info, "repo": repo_full_name.split("/")[1]}, headers={'content-type': 'application/json'})
-        branch_forecast = branch_response.json() if branch_response.status_code == 200 else None
+@app.route('/api/github/bulk', methods=['POST'])
+def analyze_github_repos():
+    """Analyse several repositories in one request; entries are streamed as they finish or returned together."""
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({"error": "request body must be a JSON object"}), 400
+    repositories = payload.get('repositories')
+    granularity = payload.get('granularity', 'monthly')
+    if not isinstance(repositories, list) or not repositories:
+        return jsonify({"error": "repositories must be a non-empty list of owner/name strings"}), 400
+    # Checked on the raw list, so an oversized request is refused before any per-name work
+    if len(repositories) > BULK_MAX_REPOSITORIES:
+        return jsonify({"error": f"at most {BULK_MAX_REPOSITORIES} repositories per request"}), 400
+    invalid = [repo for repo in repositories if not valid_repository(repo)]
+    if invalid:
+        return jsonify({"error": "repositories must be a non-empty list of owner/name strings", "invalid": invalid}), 400
+    if granularity not in GRANULARITIES:
+        return jsonify({"error": f"granularity must be one of {', '.join(GRANULARITIES)}"}), 400
+    engine = requested_engine(payload)
+    if engine not in FORECAST_ENGINES:
+        return jsonify({"error": f"forecast must be one of {', '.join(FORECAST_ENGINES)}"}), 400
+
+    # The same repository asked for twice (in any letter case) is analysed once
+    unique_repositories, seen = [], set()
+    for repo in repositories:
+        if repo.lower() not in seen:
+            seen.add(repo.lower())
+            unique_repositories.append(repo)
 
-    result = {
-        "created": created_data,
-        "closed": closed_data,
-        "starCount": repository_info.get("stargazers_count", 0),
-        "forkCount": repository_info.get("forks_count", 0),
-        "createdAtImageUrls": created_prediction.json(),
-        "closedAtImageUrls": closed_prediction.json(),
-        "pullsForecastImageUrls": pull_forecast,
-        "branchesForecastImageUrls": branch_forecast
-    }
+    entries = iter_bulk_analysis(unique_repositories, granularity, refresh=bool(payload.get('refresh')), engine=engine)
+    stream_format = requested_stream_format(payload)
+    if stream_format:
+        return stream_analysis((("result", entry) for entry in entries), stream_format)
 
-    return jsonify(result)
+    # Combined response in request order
+    entries_by_repo = {entry["repository"]: entry for entry in entries}
+    return jsonify({"repositories": [entries_by_repo[repo] for repo in unique_repositories]})
 
 
 @app.route('/api/stars', methods=['GET'])
 def fetch_repo_stars():
-    repositories = [
-        "ollama/ollama",
-        "langchain-ai/langchain",
-        "langchain-ai/langgraph",
-        "microsoft/autogen",
-        "openai/openai-cookbook",
-        "meta-llama/llama3",
-        "elastic/elasticsearch",
-        "milvus-io/pymilvus"
-    ]
-
-    token = os.getenv('GITHUB_TOKEN', 'GITHUB_TOKEN')
-    headers = {"Authorization": f'token {token}'} if token else {}
-
-    repo_stars = []
-    for repo in repositories:
-        response = requests.get(f"{GITHUB_API_BASE}repos/{repo}", headers=headers)
-        data = response.json()
-        repo_stars.append({"name": repo.split("/")[-1], "stars": data.get("stargazers_count", 0)})
-
-    star_service_url = "https://lstm-app-708210591622.us-central1.run.app/api/stars"
-    star_chart_response = requests.post(star_service_url, json={"repos": repo_stars}, headers={'content-type': 'application/json'})
-
-    return jsonify({"star_bar_chart_url": star_chart_response.json().get("star_bar_chart_url")})
+    snapshot = watchlist.current()
+    return jsonify({"star_bar_chart_url": snapshot["star_bar_chart_url"], **watchlist.staleness(snapshot)})
 
 
 @app.route('/api/forks', methods=['GET'])
 def fetch_repo_forks():
-    repositories = [
-        "ollama/ollama",
-        "langchain-ai/langchain",
-        "langchain-ai/langgraph",
-        "microsoft/autogen",
-        "openai/openai-cookbook",
-        "meta-llama/llama3",
-        "elastic/elasticsearch",
-        "milvus-io/pymilvus"
-    ]
-
-    token = os.getenv('GITHUB_TOKEN', 'GITHUB_TOKEN')
-    headers = {"Authorization": f'token {token}'} if token else {}
-
-    repo_forks = []
-    for repo in repositories:
-        response = requests.get(f"{GITHUB_API_BASE}repos/{repo}", headers=headers)
-        data = response.json()
-        repo_forks.append({"name": repo.split("/")[-1], "forks": data.get("forks_count", 0)})
+    snapshot = watchlist.current()
+    return jsonify({"forks_bar_chart_url": snapshot["forks_bar_chart_url"], **watchlist.staleness(snapshot)})
+
+
+@app.route('/api/watchlist/refresh', methods=['POST'])
+def refresh_watchlist():
+    """Refresh the watchlist stats and charts immediately instead of waiting for the next cycle."""
+    snapshot = watchlist.request_refresh()
+    return jsonify({
+        "repositories": snapshot["stats"],
+        "star_bar_chart_url": snapshot["star_bar_chart_url"],
+        "forks_bar_chart_url": snapshot["forks_bar_chart_url"],
+        **watchlist.staleness(snapshot)
+    })
+
+
+@app.route('/api/stats', methods=['GET'])
+def service_stats():
+    """In-process counters: analysis caching and coalescing, the GitHub response cache, rate-limit budgets, the LSTM client and its result cache."""
+    return jsonify({
+        "analysisResponseCache": analysis_cache.stats(),
+        "analysisSingleFlight": analysis_flight.stats(),
+        "githubResponseCache": http_client.response_cache.stats(),
+        "githubRateLimits": scheduler.snapshot(),
+        "lstmClient": lstm.stats(),
+        "forecastCache": forecast_cache.stats()
+    })
 
-    fork_service_url = "https://lstm-app-708210591622.us-central1.run.app/api/forks"
-    fork_chart_response = requests.post(fork_service_url, json={"repos": repo_forks}, headers={'content-type': 'application/json'})
 
-    return jsonify({"forks_bar_chart_url": fork_chart_response.json().get("forks_bar_chart_url")})
+# Time spent importing and configuring the app, logged once when the app is loaded
+STARTUP_REPORT = {"app_import_seconds": round(time.perf_counter() - STARTUP_BEGAN, 4)}
+print(f"Startup report: {json.dumps(STARTUP_REPORT)}")
 
 
+# Development server only; production runs under gunicorn (see gunicorn.conf.py)
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=8081)
+    app.run(debug=os.getenv('FLASK_DEBUG', '0') == '1', host='0.0.0.0', port=int(os.getenv('PORT', '8081')))
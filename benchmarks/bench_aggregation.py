@@ -0,0 +1,75 @@
+# Throughput of the issue aggregation: `python benchmarks/bench_aggregation.py [--issues N]`
+#
+# Aggregates synthetic issues spread over two years at every granularity and, when pandas is
+# installed, compares against the DataFrame groupby the analysis endpoint used to run.
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aggregation import GRANULARITIES, aggregate_issues
+
+
+def synthetic_issues(count, days=730, closed_ratio=0.7, seed=1):
+    rng = random.Random(seed)
+    first_day = date.today() - timedelta(days=days)
+    issues = []
+    for number in range(count):
+        created = first_day + timedelta(days=rng.randrange(days))
+        closed = created + timedelta(days=rng.randrange(60)) if rng.random() < closed_ratio else None
+        issues.append({
+            "issue_number": number,
+            "created_at": created.isoformat(),
+            "closed_at": closed.isoformat() if closed and closed <= date.today() else None,
+            "labels": ["bug"] if number % 3 == 0 else [],
+            "State": "closed" if closed else "open",
+            "Author": f"user{number % 500}"
+        })
+    return issues
+
+
+def pandas_monthly(issues):
+    import pandas as pd
+
+    issues_df = pd.DataFrame(issues)
+    created_monthly = issues_df.groupby(pd.to_datetime(issues_df['created_at']).dt.to_period('M')).size()
+    closed_monthly = issues_df.dropna(subset=["closed_at"]).groupby(pd.to_datetime(issues_df['closed_at']).dt.to_period('M')).size()
+    return ([[str(month), int(count)] for month, count in created_monthly.items()],
+            [[str(month), int(count)] for month, count in closed_monthly.items()])
+
+
+def timed(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--issues", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    issues = synthetic_issues(args.issues)
+    print(f"{args.issues} issues, best of {args.repeat}")
+    for granularity in GRANULARITIES:
+        seconds = timed(lambda: aggregate_issues(issues, granularity), args.repeat)
+        print(f"  aggregation {granularity:8s} {seconds * 1000:8.1f} ms  {args.issues / seconds:12,.0f} issues/s")
+
+    try:
+        seconds = timed(lambda: pandas_monthly(issues), args.repeat)
+    except ImportError:
+        print("  pandas not installed, skipping the DataFrame baseline")
+    else:
+        print(f"  pandas      monthly  {seconds * 1000:8.1f} ms  {args.issues / seconds:12,.0f} issues/s")
+
+
+if __name__ == "__main__":
+    main()
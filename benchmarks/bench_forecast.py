@@ -0,0 +1,76 @@
+# Local vs remote forecast latency: `python benchmarks/bench_forecast.py [options]`
+#
+# Times the in-process forecasts of one repository's created, closed, pulls and branches series
+# (uncached fits and cached) against the four LSTM forecast calls sent concurrently to the stub
+# LSTM service, which answers after `--lstm-latency-ms` like a warm remote instance would. The
+# LSTM result cache is off unless `--warm-caches` is given, so every remote call is measured.
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from stub_servers import load_fixture, start_stubs
+from bench_aggregation import synthetic_issues
+
+
+def timed(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--issues", type=int, default=20_000)
+    parser.add_argument("--lstm-latency-ms", type=float, default=500)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--warm-caches", action="store_true", help="serve repeated LSTM calls from the forecast cache")
+    args = parser.parse_args()
+
+    _, lstm_base, _ = start_stubs(load_fixture(), lstm_latency=args.lstm_latency_ms / 1000)
+    os.environ.update({
+        "LSTM_API_BASE": lstm_base,
+        "FORECAST_PAYLOAD_MODE": "compact",
+        "FORECAST_CACHE_PATH": os.path.join(tempfile.mkdtemp(prefix="bench-forecast-"), "forecasts.sqlite3")
+        if args.warm_caches else ""
+    })
+    import local_forecast
+    from forecasts import dispatch_forecasts, issue_forecast_jobs
+    from issue_search import analysis_start
+    from issue_table import IssueTable
+
+    issues = IssueTable.from_records(synthetic_issues(args.issues))
+    pulls = [{"pull_number": row["issue_number"], "created_at": row["created_at"]} for row in synthetic_issues(2000, seed=2)]
+    branches = [{"branch_name": f"branch-{index}", "created_at": row["created_at"]}
+                for index, row in enumerate(synthetic_issues(300, seed=3))]
+
+    def local_uncached():
+        local_forecast._fitted.clear()
+        local_forecast.local_forecasts("stub/repo", issues, pulls, branches, analysis_start())
+
+    def local_cached():
+        local_forecast.local_forecasts("stub/repo", issues, pulls, branches, analysis_start())
+
+    def remote():
+        jobs = issue_forecast_jobs(issues, "repo")
+        jobs["pullsForecastImageUrls"] = ("/api/forecast/pulls", {"pulls": pulls, "repo": "repo"})
+        jobs["branchesForecastImageUrls"] = ("/api/forecast/branches", {"branches": branches, "repo": "repo"})
+        dispatch_forecasts(jobs)
+
+    print(f"{args.issues} issues, 4 series, median / max of {args.repeat}")
+    for name, function in (("local, fitted", local_uncached), ("local, cached", local_cached), ("remote LSTM", remote)):
+        median, worst = timed(function, args.repeat)
+        print(f"  {name:14s} {median * 1000:8.1f} ms  {worst * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
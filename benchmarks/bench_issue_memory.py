@@ -0,0 +1,57 @@
+# Memory footprint of harvested issues: `python benchmarks/bench_issue_memory.py [--issues N]`
+#
+# Decodes synthetic issues the way the issue store hands them out (one JSON record per issue, so
+# no strings are shared between issues) into a list of dicts and into an `IssueTable`, and
+# reports the memory each holds and the peak while building it, measured with tracemalloc, plus
+# the monthly aggregation time on both.
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from aggregation import aggregate_issues
+from issue_table import IssueTable
+from bench_aggregation import synthetic_issues
+
+
+def measure(build):
+    """Return `(result, retained bytes, peak bytes)` of building a structure."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, retained, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--issues", type=int, default=50_000)
+    args = parser.parse_args()
+
+    stored_records = [json.dumps(issue) for issue in synthetic_issues(args.issues)]
+    builds = {
+        "list of dicts": lambda: [json.loads(record) for record in stored_records],
+        "IssueTable": lambda: IssueTable.from_records(json.loads(record) for record in stored_records),
+    }
+
+    print(f"{args.issues} issues")
+    for name, build in builds.items():
+        issues, retained, peak = measure(build)
+        started = time.perf_counter()
+        aggregate_issues(issues, "monthly")
+        seconds = time.perf_counter() - started
+        print(f"  {name:14s} retained {retained / 2**20:7.1f} MiB ({retained / args.issues:6.0f} B/issue)  "
+              f"peak {peak / 2**20:7.1f} MiB  monthly aggregation {seconds * 1000:6.1f} ms")
+        del issues
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# Serialization and compression cost of /api/github responses: `python benchmarks/bench_serialization.py`
+#
+# Builds realistic response bodies (monthly and daily series plus the four forecast payloads) and
+# compares Flask's default JSON provider with the orjson provider when building the response the
+# way `jsonify` does (`provider.response`), then the size and time of gzip and Brotli
+# compression at the configured levels.
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import serialization
+from aggregation import aggregate_issues
+
+IMAGE_BASE = "https://storage.googleapis.com/lstm-forecasts/images/"
+
+
+def forecast_payload(kind, repo):
+    return {
+        "model_loss_image_url": f"{IMAGE_BASE}model_loss_{kind}_{repo}.png",
+        "lstm_generated_image_url": f"{IMAGE_BASE}lstm_generated_data_{kind}_{repo}.png",
+        f"all_{kind}_data_image": f"{IMAGE_BASE}all_{kind}_data_{repo}.png",
+        "prophet_forecast_image_url": f"{IMAGE_BASE}prophet_forecast_{kind}_{repo}.png",
+        "sarimax_forecast_image_url": f"{IMAGE_BASE}sarimax_forecast_{kind}_{repo}.png"
+    }
+
+
+def realistic_response(granularity, issue_count=20_000, repo="langchain"):
+    first_day = date.today() - timedelta(days=730)
+    issues = [{
+        "created_at": (first_day + timedelta(days=number * 7 % 730)).isoformat(),
+        "closed_at": (first_day + timedelta(days=min(729, number * 7 % 730 + number % 30))).isoformat() if number % 4 else None
+    } for number in range(issue_count)]
+    counts = aggregate_issues(issues, granularity)
+    return {
+        "created": counts["created"],
+        "closed": counts["closed"],
+        "starCount": 104_000,
+        "forkCount": 16_800,
+        "createdAtImageUrls": forecast_payload("issues", repo),
+        "closedAtImageUrls": forecast_payload("issues", repo),
+        "pullsForecastImageUrls": forecast_payload("pulls", repo),
+        "branchesForecastImageUrls": forecast_payload("branches", repo)
+    }
+
+
+def timed(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - started) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    providers = {"default": DefaultJSONProvider(app)}
+    if serialization.orjson is not None:
+        providers["orjson"] = serialization.OrjsonProvider(app)
+
+    for granularity in ("monthly", "daily"):
+        body = realistic_response(granularity)
+        print(f"{granularity} response")
+        with app.app_context():
+            for name, provider in providers.items():
+                seconds, response = timed(lambda: provider.response(body), args.repeat)
+                print(f"  {name:8s} response {seconds * 1e6:9.1f} us  {len(response.get_data()):8d} bytes")
+
+        data = json.dumps(body).encode()
+        for encoding in serialization.supported_encodings():
+            seconds, compressed = timed(lambda: serialization.compress(data, encoding), max(1, args.repeat // 10))
+            print(f"  {encoding:8s}          {seconds * 1e6:9.1f} us  {len(compressed):8d} bytes "
+                  f"({len(compressed) / len(data):.0%} of {len(data)})")
+
+
+if __name__ == "__main__":
+    main()
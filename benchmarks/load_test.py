@@ -0,0 +1,121 @@
+# Offline latency and throughput benchmark: `python benchmarks/load_test.py [options]`
+#
+# Starts the GitHub and LSTM stubs, points the app at them through GITHUB_API_BASE and
+# LSTM_API_BASE, serves it with a threaded WSGI server and drives /api/github, /api/stars and
+# /api/forks at several concurrency levels, reporting p50/p95/p99 latency and requests per second.
+# By default the response cache, the issue store and the forecast cache are disabled so every
+# /api/github request runs the full pipeline; `--warm-caches` measures the cached path instead,
+# starting from empty caches.
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from stub_servers import FIXTURE_PATH, load_fixture, start_stubs
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def start_app(environment):
+    """Import the app with the stub configuration and serve it on a free local port."""
+    os.environ.update(environment)
+    from werkzeug.serving import make_server
+    import app
+
+    # Per-request access lines would drown the report
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def run_level(send, total_requests, concurrency):
+    """Send `total_requests` requests with `concurrency` clients; returns (latencies, errors, seconds)."""
+    local = threading.local()
+    latencies, errors = [], []
+
+    def one(index):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            response = send(session, index)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+        except requests.RequestException as error:
+            errors.append(type(error).__name__)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total_requests)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--fixture", default=FIXTURE_PATH)
+    parser.add_argument("--synthetic-issues", type=int, default=3000)
+    parser.add_argument("--synthetic-pulls", type=int, default=500)
+    parser.add_argument("--synthetic-branches", type=int, default=200)
+    parser.add_argument("--github-latency-ms", type=float, default=20)
+    parser.add_argument("--lstm-latency-ms", type=float, default=200)
+    parser.add_argument("--search-limit", type=int, default=100_000, help="stub search calls per minute")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated client counts")
+    parser.add_argument("--requests", type=int, default=32, help="requests per endpoint and concurrency level")
+    parser.add_argument("--endpoints", default="github,stars,forks")
+    parser.add_argument("--warm-caches", action="store_true", help="keep the response, issue and forecast caches on")
+    args = parser.parse_args()
+
+    fixture = load_fixture(args.fixture, args.synthetic_issues, synthetic_pulls=args.synthetic_pulls,
+                           synthetic_branches=args.synthetic_branches)
+    github_base, lstm_base, _ = start_stubs(fixture, args.github_latency_ms / 1000, args.lstm_latency_ms / 1000,
+                                            args.search_limit)
+    store_dir = tempfile.mkdtemp(prefix="load-test-")
+    base_url = start_app({
+        "GITHUB_API_BASE": github_base,
+        "LSTM_API_BASE": lstm_base,
+        "GITHUB_TOKEN": "stub-token-1,stub-token-2",
+        "ISSUE_STORE_PATH": os.path.join(store_dir, "issues.sqlite3") if args.warm_caches else "",
+        "RESPONSE_CACHE_BACKEND": "memory" if args.warm_caches else "none",
+        "FORECAST_CACHE_PATH": os.path.join(store_dir, "forecasts.sqlite3") if args.warm_caches else ""
+    })
+
+    endpoints = {
+        # Distinct repositories so requests are neither coalesced nor cached unless asked to
+        "github": lambda session, index: session.post(
+            f"{base_url}/api/github",
+            json={"repository": f"stub/repo{0 if args.warm_caches else index}"},
+            headers={"Accept-Encoding": "gzip"}),
+        "stars": lambda session, index: session.get(f"{base_url}/api/stars"),
+        "forks": lambda session, index: session.get(f"{base_url}/api/forks"),
+    }
+
+    print(f"{'endpoint':10s} {'clients':>7s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} {'req/s':>8s} {'errors':>6s}")
+    for name in args.endpoints.split(","):
+        send = endpoints[name]
+        # One untimed request warms connection pools and background workers
+        send(requests.Session(), 0)
+        for concurrency in (int(level) for level in args.concurrency.split(",")):
+            latencies, errors, seconds = run_level(send, args.requests, concurrency)
+            print(f"{name:10s} {concurrency:7d} {percentile(latencies, 0.50) * 1000:9.1f} "
+                  f"{percentile(latencies, 0.95) * 1000:9.1f} {percentile(latencies, 0.99) * 1000:9.1f} "
+                  f"{len(latencies) / seconds:8.1f} {len(errors):6d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+# Local stand-ins for the GitHub API and the LSTM microservice, for offline benchmarks.
+#
+# Both servers replay a fixture file (see fixtures/github.json): repository metadata, pulls,
+# branches and the forecast image URLs are served as recorded, and the issue search filters the
+# recorded issues by the `created:` / `updated:` range of the query, with `total_count` and
+# paging like the real search API. Pull and branch listings are paged with `Link` headers. The
+# recorded issues, pulls and branches can be padded with synthetic ones to model busy
+# repositories. Every response can be delayed, and the GitHub stub meters calls per resource
+# and answers with X-RateLimit-* headers and 403s once a budget is spent.
+#
+# Run standalone with `python benchmarks/stub_servers.py`, or use `start_stubs()` from Python.
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from datetime import date, datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "github.json")
+
+
+def load_fixture(path=FIXTURE_PATH, synthetic_issues=0, days=730, seed=7, synthetic_pulls=0, synthetic_branches=0):
+    """Load a recorded fixture and add synthetic issues and pulls spread over the last `days` days, and branches."""
+    with open(path) as fixture_file:
+        fixture = json.load(fixture_file)
+
+    rng = random.Random(seed)
+    first_number = max([issue["number"] for issue in fixture["issues"]] + [0]) + 1
+    for offset in range(synthetic_issues):
+        created = datetime.combine(date.today() - timedelta(days=rng.randrange(days)), datetime.min.time())
+        created += timedelta(seconds=rng.randrange(86400))
+        closed = created + timedelta(days=rng.randrange(90)) if rng.random() < 0.7 else None
+        fixture["issues"].append({
+            "number": first_number + offset,
+            "created_at": created.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "updated_at": (closed or created).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "closed_at": closed.strftime("%Y-%m-%dT%H:%M:%SZ") if closed and closed < datetime.now() else None,
+            "state": "closed" if closed else "open",
+            "labels": [{"name": "bug"}] if offset % 3 == 0 else [],
+            "user": {"login": f"user{offset % 200}"}
+        })
+    first_number += synthetic_issues
+    for offset in range(synthetic_pulls):
+        created = datetime.combine(date.today() - timedelta(days=rng.randrange(days * 2)), datetime.min.time())
+        fixture["pulls"].append({"number": first_number + offset, "created_at": created.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                                 "state": "closed"})
+    for offset in range(synthetic_branches):
+        fixture["branches"].append({"name": f"branch-{offset}", "commit": {"sha": f"{rng.getrandbits(160):040x}"}})
+
+    # The search API and the pull listing (sort=created) return the newest first
+    fixture["issues"].sort(key=lambda issue: issue["created_at"], reverse=True)
+    fixture["pulls"].sort(key=lambda pull: pull["created_at"], reverse=True)
+    return fixture
+
+
+class RateLimiter:
+    """Fixed-window budgets per resource, reported through X-RateLimit-* headers."""
+
+    def __init__(self, limits):
+        self.limits = limits
+        self.windows = {}
+        self.lock = threading.Lock()
+
+    def spend(self, resource, cost=1):
+        limit, window = self.limits[resource]
+        with self.lock:
+            used, reset_at = self.windows.get(resource, (0, time.time() + window))
+            if time.time() >= reset_at:
+                used, reset_at = 0, time.time() + window
+            allowed = used + cost <= limit
+            used += cost if allowed else 0
+            self.windows[resource] = (used, reset_at)
+        headers = {
+            "X-RateLimit-Limit": str(limit),
+            "X-RateLimit-Remaining": str(limit - used),
+            "X-RateLimit-Reset": str(int(reset_at)),
+            "X-RateLimit-Resource": resource
+        }
+        return allowed, headers
+
+
+def parse_bound(value):
+    value = value.replace("+00:00", "")
+    return datetime.fromisoformat(value) if "T" in value else datetime.combine(date.fromisoformat(value), datetime.min.time())
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    fixture = None
+    latency = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length)) if length else None
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+class GitHubStubHandler(StubHandler):
+    rate_limiter = None
+
+    def respond(self, resource, status, body, headers=None):
+        time.sleep(self.latency)
+        # Conditional requests against the recorded body; a 304 costs no budget
+        etag = f'"{zlib.crc32(json.dumps(body, sort_keys=True).encode()):08x}"'
+        not_modified = status == 200 and self.headers.get("If-None-Match") == etag
+        allowed, limit_headers = self.rate_limiter.spend(resource, cost=0 if not_modified else 1)
+        headers = dict(headers or {}, **limit_headers)
+        if not allowed:
+            return self.send_json(403, {"message": "API rate limit exceeded"}, headers)
+        headers["ETag"] = etag
+        if not_modified:
+            return self.send_json(304, None, headers)
+        self.send_json(status, body, headers)
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        path = parts.path.rstrip("/")
+
+        if path.endswith("/search/issues"):
+            return self.respond("search", 200, self.search_issues(query))
+        match = re.fullmatch(r".*/repos/([^/]+)/([^/]+)(/pulls|/branches)?", path)
+        if not match:
+            return self.respond("core", 404, {"message": "Not Found"})
+        if match.group(3):
+            return self.respond("core", 200, *self.list_page(parts, query, self.fixture[match.group(3)[1:]]))
+        return self.respond("core", 200, dict(self.fixture["repository"], full_name=f"{match.group(1)}/{match.group(2)}"))
+
+    def do_POST(self):
+        body = self.read_body() or {}
+        if not urlsplit(self.path).path.endswith("/graphql"):
+            return self.respond("core", 404, {"message": "Not Found"})
+        stats = self.fixture["repository"]
+        query, variables = body.get("query", ""), body.get("variables") or {}
+        aliases = re.findall(r"(\w+): repository\(", query)
+        data = {alias: {"stargazerCount": stats["stargazers_count"], "forkCount": stats["forks_count"]} for alias in aliases}
+        commits = re.findall(r"(\w+): object\(oid: \$(\w+)\)", query)
+        if commits:
+            # Commit dates derived from the SHA, so they are stable across requests
+            data["repository"] = {alias: {"committedDate": self.commit_date(variables.get(variable, ""))}
+                                  for alias, variable in commits}
+        self.respond("graphql", 200, {"data": data})
+
+    @staticmethod
+    def commit_date(sha):
+        day = date.today() - timedelta(days=int(sha[:6] or "0", 16) % 730)
+        return f"{day.isoformat()}T12:00:00Z"
+
+    def list_page(self, parts, query, items):
+        """One page of a listing and its Link header, like the REST API's pagination."""
+        per_page = int(query.get("per_page", ["30"])[0])
+        page = int(query.get("page", ["1"])[0])
+        last = max(1, -(-len(items) // per_page))
+        links = []
+        for rel, target in (("next", page + 1), ("last", last)):
+            if page < last:
+                target_query = "&".join(f"{name}={values[0]}" for name, values in query.items() if name != "page")
+                links.append(f'<http://{self.headers["Host"]}{parts.path}?{target_query}&page={target}>; rel="{rel}"')
+        return items[(page - 1) * per_page:page * per_page], {"Link": ", ".join(links)} if links else {}
+
+    def search_issues(self, query):
+        match = re.search(r"(created|updated):(\S+)\.\.(\S+)", query.get("q", [""])[0])
+        if not match:
+            return {"total_count": 0, "incomplete_results": False, "items": []}
+        field, start, end = match.group(1), parse_bound(match.group(2)), parse_bound(match.group(3))
+        if "T" not in match.group(3):
+            end += timedelta(days=1, seconds=-1)
+
+        matching = [issue for issue in self.fixture["issues"]
+                    if start <= datetime.fromisoformat(issue[f"{field}_at"].rstrip("Z")) <= end]
+        per_page = int(query.get("per_page", ["30"])[0])
+        page = int(query.get("page", ["1"])[0])
+        # Like GitHub, only the first 1000 results of a query are reachable
+        reachable = matching[:1000]
+        return {
+            "total_count": len(matching),
+            "incomplete_results": False,
+            "items": reachable[(page - 1) * per_page:page * per_page]
+        }
+
+
+class LstmStubHandler(StubHandler):
+    def do_GET(self):
+        time.sleep(self.latency)
+        if urlsplit(self.path).path == "/api/capabilities":
+            return self.send_json(200, {"payload_formats": ["issues", "daily_series"]})
+        self.send_json(404, {"error": "Not Found"})
+
+    def do_POST(self):
+        body = self.read_body() or {}
+        time.sleep(self.latency)
+        path = urlsplit(self.path).path
+        responses = self.fixture["lstm"]
+        if path not in responses:
+            return self.send_json(404, {"error": "Not Found"})
+        repo = body.get("repo", "repo")
+        self.send_json(200, {key: value.format(repo=repo) for key, value in responses[path].items()})
+
+
+def serve(handler_class, port=0, **attributes):
+    """Start a threaded stub server on localhost; returns the server (see `server_address`)."""
+    handler = type(handler_class.__name__, (handler_class,), attributes)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_stubs(fixture, github_latency=0.0, lstm_latency=0.0, search_limit=100_000, core_limit=1_000_000,
+                github_port=0, lstm_port=0):
+    """Start both stubs and return `(github_base_url, lstm_base_url, servers)`."""
+    rate_limiter = RateLimiter({"core": (core_limit, 3600), "search": (search_limit, 60), "graphql": (core_limit, 3600)})
+    github = serve(GitHubStubHandler, github_port, fixture=fixture, latency=github_latency, rate_limiter=rate_limiter)
+    lstm = serve(LstmStubHandler, lstm_port, fixture=fixture, latency=lstm_latency)
+    return (f"http://127.0.0.1:{github.server_address[1]}/",
+            f"http://127.0.0.1:{lstm.server_address[1]}",
+            (github, lstm))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the GitHub and LSTM stubs until interrupted.")
+    parser.add_argument("--fixture", default=FIXTURE_PATH)
+    parser.add_argument("--synthetic-issues", type=int, default=5000)
+    parser.add_argument("--github-latency-ms", type=float, default=50)
+    parser.add_argument("--lstm-latency-ms", type=float, default=500)
+    parser.add_argument("--search-limit", type=int, default=30, help="search calls per minute, like GitHub")
+    parser.add_argument("--github-port", type=int, default=8090)
+    parser.add_argument("--lstm-port", type=int, default=8091)
+    args = parser.parse_args()
+
+    fixture = load_fixture(args.fixture, args.synthetic_issues)
+    github_base, lstm_base, _ = start_stubs(fixture, args.github_latency_ms / 1000, args.lstm_latency_ms / 1000,
+                                            args.search_limit, github_port=args.github_port, lstm_port=args.lstm_port)
+    print(f"GITHUB_API_BASE={github_base} LSTM_API_BASE={lstm_base}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# Head-commit dates of branches through batched GitHub GraphQL lookups.
+#
+# The REST branch listing already gives each branch's head SHA. A commit never changes, so its
+# date is cached per SHA, in process and in the issue store when persistence is enabled, and
+# only SHAs never seen before are looked up: GRAPHQL_BATCH_SIZE commits per aliased query, a few
+# queries at a time. Branches whose head did not move cost no request at all.
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import http_client
+import metrics
+from settings import GITHUB_GRAPHQL_URL, GRAPHQL_BATCH_SIZE, COMMIT_DATE_CACHE_SIZE, ACTIVITY_PAGE_CONCURRENCY
+from issue_store import get_store
+
+_dates = OrderedDict()
+_dates_lock = threading.Lock()
+
+
+def build_commit_dates_query(repository_name, shas):
+    """Build one aliased query (and its variables) for the commit dates of a chunk of SHAs."""
+    owner, name = repository_name.split("/", 1)
+    declarations, fields, variables = ["$owner: String!", "$name: String!"], [], {"owner": owner, "name": name}
+    for index, sha in enumerate(shas):
+        declarations.append(f"$oid{index}: GitObjectID!")
+        fields.append(f"commit{index}: object(oid: $oid{index}) {{ ... on Commit {{ committedDate }} }}")
+        variables[f"oid{index}"] = sha
+    query = f"query({', '.join(declarations)}) {{ repository(owner: $owner, name: $name) {{ {' '.join(fields)} }} }}"
+    return query, variables
+
+
+def fetch_commit_dates_chunk(repository_name, shas):
+    """Fetch one chunk; returns {sha: "YYYY-MM-DD"} for the commits GitHub resolved, or None on failure."""
+    query, variables = build_commit_dates_query(repository_name, shas)
+    response = http_client.post(GITHUB_GRAPHQL_URL, json={"query": query, "variables": variables})
+    if response.status_code != 200:
+        return None
+
+    repository = (response.json().get("data") or {}).get("repository") or {}
+    dates = {}
+    for index, sha in enumerate(shas):
+        committed_date = (repository.get(f"commit{index}") or {}).get("committedDate")
+        if committed_date:
+            dates[sha] = committed_date[:10]
+    return dates
+
+
+def remember(dates):
+    with _dates_lock:
+        for sha, committed_date in dates.items():
+            _dates[sha] = committed_date
+            _dates.move_to_end(sha)
+        while len(_dates) > COMMIT_DATE_CACHE_SIZE:
+            _dates.popitem(last=False)
+
+
+def commit_dates(repository_name, shas):
+    """Return {sha: "YYYY-MM-DD"} for the given head commits; unresolved SHAs are left out."""
+    dates = {}
+    with _dates_lock:
+        for sha in shas:
+            if sha in _dates:
+                dates[sha] = _dates[sha]
+                _dates.move_to_end(sha)
+
+    missing = [sha for sha in dict.fromkeys(shas) if sha not in dates]
+    store = get_store()
+    if missing and store is not None:
+        stored = store.commit_dates(missing)
+        remember(stored)
+        dates.update(stored)
+        missing = [sha for sha in missing if sha not in stored]
+    if not missing:
+        return dates
+
+    chunks = [missing[start:start + GRAPHQL_BATCH_SIZE] for start in range(0, len(missing), GRAPHQL_BATCH_SIZE)]
+    fetched = {}
+    with ThreadPoolExecutor(max_workers=max(1, ACTIVITY_PAGE_CONCURRENCY)) as pool:
+        futures = [pool.submit(metrics.in_context(fetch_commit_dates_chunk), repository_name, chunk) for chunk in chunks]
+        for future in futures:
+            fetched.update(future.result() or {})
+    # Failed chunks are simply retried next time; only resolved commits are cached
+    remember(fetched)
+    if store is not None and fetched:
+        store.save_commit_dates(fetched)
+    dates.update(fetched)
+    return dates
@@ -0,0 +1,82 @@
+# Content-addressed cache of LSTM results (forecasts and bar charts), persisted in SQLite.
+#
+# Entries are keyed by a hash of the endpoint and its normalized inputs (series, forecast type,
+# repository), so a forecast whose input did not change is answered locally, across requests,
+# worker processes and restarts. Entries expire after FORECAST_CACHE_TTL seconds and the least
+# recently used ones are evicted beyond FORECAST_CACHE_MAX_ENTRIES.
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from settings import FORECAST_CACHE_PATH, FORECAST_CACHE_TTL, FORECAST_CACHE_MAX_ENTRIES
+
+
+def content_key(path, inputs):
+    """Hash of an endpoint and its inputs, independent of key order."""
+    canonical = json.dumps({"path": path, "inputs": inputs}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class ForecastCache:
+    """SQLite table of results with a TTL and least-recently-used eviction; disabled without a path."""
+
+    def __init__(self, path, ttl, max_entries):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if self.path:
+            with closing(sqlite3.connect(self.path, timeout=30)) as conn, conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("CREATE TABLE IF NOT EXISTS forecasts "
+                             "(key TEXT PRIMARY KEY, stored_at REAL NOT NULL, used_at REAL NOT NULL, value TEXT NOT NULL)")
+                conn.execute("CREATE INDEX IF NOT EXISTS forecasts_by_use ON forecasts (used_at)")
+
+    def get(self, key):
+        if not self.path:
+            return None
+        now = time.time()
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn, conn:
+            row = conn.execute("SELECT value FROM forecasts WHERE key = ? AND stored_at > ?",
+                               (key, now - self.ttl)).fetchone()
+            if row:
+                conn.execute("UPDATE forecasts SET used_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value):
+        if not self.path:
+            return
+        now = time.time()
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO forecasts (key, stored_at, used_at, value) VALUES (?, ?, ?, ?)",
+                         (key, now, now, json.dumps(value)))
+            conn.execute("DELETE FROM forecasts WHERE stored_at <= ?", (now - self.ttl,))
+            conn.execute("DELETE FROM forecasts WHERE key IN "
+                         "(SELECT key FROM forecasts ORDER BY used_at DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    def fetch(self, key, compute):
+        """Return the cached result or compute it; only successful (dict) results are stored."""
+        value = self.get(key)
+        with self._lock:
+            if value is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if value is not None:
+            return value
+        value = compute()
+        if isinstance(value, dict):
+            self.set(key, value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {"enabled": bool(self.path), "hits": self.hits, "misses": self.misses}
+
+
+forecast_cache = ForecastCache(FORECAST_CACHE_PATH, FORECAST_CACHE_TTL, FORECAST_CACHE_MAX_ENTRIES)
@@ -0,0 +1,166 @@
+# Concurrent dispatch of the LSTM forecast requests.
+#
+# The created, closed, pulls and branches forecasts are independent model runs, so they are sent
+# together and gathered against one deadline. A forecast that fails or misses the deadline comes
+# back as None instead of failing the whole analysis.
+#
+# Issue forecasts can be sent in a compact form: one gap-filled daily series of created and
+# closed counts, built once and shared by both forecast types, instead of the full issue list
+# (labels, authors, state) twice. The compact form is only used when the LSTM service advertises
+# it through `/api/capabilities`, and a rejected compact request is retried in the legacy form.
+# Calls go through `lstm_client`, so timeouts, the circuit breaker and hedging apply to them, and
+# results are reused from `forecast_cache` while the normalized inputs stay the same.
+import functools
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
+
+import metrics
+from lstm_client import lstm, LstmUnavailable
+from forecast_cache import forecast_cache, content_key
+from aggregation import build_series
+from settings import (FORECAST_TIMEOUT, FORECAST_CONCURRENCY, FORECAST_PAYLOAD_MODE,
+                      FORECAST_CAPABILITIES_TTL)
+
+COMPACT_ISSUES_FORMAT = "daily_series"
+# Statuses with which a service that doesn't understand the compact body rejects it
+COMPACT_REJECTED_STATUSES = (400, 415, 422)
+
+_forecast_pool = ThreadPoolExecutor(max_workers=FORECAST_CONCURRENCY, thread_name_prefix="forecast")
+_capabilities = {"compact": None, "checked_at": 0.0}
+_capabilities_lock = threading.Lock()
+
+
+def compact_payloads_supported():
+    """Whether issue forecasts should be sent as a compact series, per FORECAST_PAYLOAD_MODE."""
+    if FORECAST_PAYLOAD_MODE in ("compact", "legacy"):
+        return FORECAST_PAYLOAD_MODE == "compact"
+
+    with _capabilities_lock:
+        if _capabilities["compact"] is not None and time.monotonic() - _capabilities["checked_at"] < FORECAST_CAPABILITIES_TTL:
+            return _capabilities["compact"]
+        try:
+            response = lstm.request("GET", "/api/capabilities", timeout=5)
+            formats = response.json().get("payload_formats", []) if response.status_code == 200 else []
+        except LstmUnavailable:
+            # Don't remember the answer of a service that is down
+            return False
+        except (ValueError, AttributeError):
+            formats = []
+        _capabilities["compact"] = COMPACT_ISSUES_FORMAT in formats
+        _capabilities["checked_at"] = time.monotonic()
+        return _capabilities["compact"]
+
+
+def disable_compact_payloads():
+    """Fall back to legacy bodies until the next capability check."""
+    with _capabilities_lock:
+        _capabilities["compact"] = False
+        _capabilities["checked_at"] = time.monotonic()
+
+
+def build_issue_series(issues_data):
+    """Gap-filled daily created and closed counts covering every date in the issues, read from the table's columns."""
+    series = build_series(issues_data, "daily")
+    return {
+        "granularity": "daily",
+        "start": series["labels"][0] if series["labels"] else None,
+        "created_at": series["created"],
+        "closed_at": series["closed"]
+    }
+
+
+def issue_forecast_jobs(issues_data, repo_name):
+    """Build the created_at and closed_at forecast jobs from an `IssueTable`, compact when the service supports it.
+
+    Per-issue dicts are only materialized for legacy bodies; as a fallback they are built lazily,
+    if the service actually rejects the compact form.
+    """
+    jobs = {}
+    series = build_issue_series(issues_data) if compact_payloads_supported() else None
+    issue_records = issues_data.records() if series is None else None
+    for key, forecast_type in (("createdAtImageUrls", "created_at"), ("closedAtImageUrls", "closed_at")):
+        if series is None:
+            jobs[key] = ("/api/forecast", {"issues": issue_records, "type": forecast_type, "repo": repo_name})
+        else:
+            compact_body = {"format": COMPACT_ISSUES_FORMAT, "series": series, "type": forecast_type, "repo": repo_name}
+            legacy_body = functools.partial(legacy_issue_body, issues_data, forecast_type, repo_name)
+            jobs[key] = ("/api/forecast", compact_body, legacy_body)
+    return jobs
+
+
+def legacy_issue_body(issues_data, forecast_type, repo_name):
+    return {"issues": issues_data.records(), "type": forecast_type, "repo": repo_name}
+
+
+def forecast_cache_key(path, body):
+    """Content key of a forecast request: its type, repository and normalized input series.
+
+    Compact and legacy issue bodies reduce to the same daily series, pulls and branches to
+    their counts per creation day, so equivalent requests share one entry.
+    """
+    if "series" in body:
+        series = body["series"]
+    elif "issues" in body:
+        series = build_issue_series(body["issues"])
+    elif "pulls" in body or "branches" in body:
+        rows = body.get("pulls") or body.get("branches") or []
+        series = sorted(Counter(row.get("created_at") for row in rows).items())
+    else:
+        return content_key(path, body)
+    return content_key(path, {"type": body.get("type"), "repo": body.get("repo"), "series": series})
+
+
+def post_forecast(path, body, timeout=FORECAST_TIMEOUT, fallback_body=None):
+    """POST one forecast request and return its JSON, or None if it failed.
+
+    When the service rejects a compact body, `fallback_body` (a body, or a function building it) is sent instead.
+    A result cached for the same inputs is returned without calling the service.
+    """
+    return forecast_cache.fetch(forecast_cache_key(path, body),
+                                lambda: request_forecast(path, body, timeout, fallback_body))
+
+
+def request_forecast(path, body, timeout=FORECAST_TIMEOUT, fallback_body=None):
+    try:
+        response = lstm.request("POST", path, json=body, timeout=timeout)
+        if fallback_body is not None and response.status_code in COMPACT_REJECTED_STATUSES:
+            disable_compact_payloads()
+            if callable(fallback_body):
+                fallback_body = fallback_body()
+            response = lstm.request("POST", path, json=fallback_body, timeout=timeout)
+    except LstmUnavailable as error:
+        print(f"Forecast request to {path} failed: {error}")
+        return None
+
+    if response.status_code != 200:
+        print(f"Forecast request to {path} returned HTTP {response.status_code}")
+        return None
+    try:
+        return response.json()
+    except ValueError:
+        print(f"Forecast request to {path} returned a non-JSON body")
+        return None
+
+
+def iter_forecasts(jobs, timeout=FORECAST_TIMEOUT):
+    """Run `{result_key: (path, body[, fallback_body])}` forecasts concurrently.
+
+    Yields `(result_key, json or None)` as each forecast finishes; forecasts still running at the
+    deadline are yielded last as None.
+    """
+    futures = {_forecast_pool.submit(metrics.in_context(post_forecast), job[0], job[1], timeout, *job[2:]): key for key, job in jobs.items()}
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            yield futures.pop(future), future.result()
+    except TimeoutError:
+        for future, key in futures.items():
+            print(f"Forecast {key} did not finish within {timeout}s")
+            future.cancel()
+            yield key, None
+
+
+def dispatch_forecasts(jobs, timeout=FORECAST_TIMEOUT):
+    """Run forecasts concurrently and return `{result_key: json or None}` once all are done."""
+    return dict(iter_forecasts(jobs, timeout))
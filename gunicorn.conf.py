@@ -0,0 +1,38 @@
+# Production serving configuration: `gunicorn --config gunicorn.conf.py app:app`
+#
+# The app is imported once in the master (preload_app) and forked into WEB_CONCURRENCY worker
+# processes of GUNICORN_THREADS threads each. Every worker opens its own upstream connection pools
+# right after the fork so the first request does not pay for the TLS handshakes.
+import os
+import threading
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8081')}"
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+worker_class = "gthread"
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+preload_app = True
+# Cloud Run enforces its own request timeout
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '0'))
+keepalive = 75
+accesslog = "-"
+
+
+def post_fork(server, worker):
+    import http_client
+
+    # Connections must never be shared across processes
+    http_client.close_all()
+    threading.Thread(target=http_client.warm, name="warm-pools", daemon=True).start()
+
+
+def child_exit(server, worker):
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def when_ready(server):
+    from app import STARTUP_REPORT
+
+    server.log.info(f"Startup report: {STARTUP_REPORT}")
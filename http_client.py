@@ -0,0 +1,265 @@
+# Process-wide HTTP client with a keep-alive connection pool per upstream host.
+#
+# All GitHub and LSTM calls go through `get` and `post` so TLS connections are reused across
+# fetchers and requests instead of being opened for every call. GitHub GETs additionally go
+# through a conditional-request cache: stored ETag / Last-Modified validators are sent back and a
+# 304 is answered from the cached body, which does not count against the rate limit. Every
+# GitHub call is scheduled by `rate_limit.scheduler`, which picks the token it is sent with.
+# Every call that reaches an upstream is recorded in `metrics`.
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from settings import GITHUB_API_BASE, LSTM_API_BASE, HTTP_POOL_SIZE, HTTP_CACHE_MAX_BYTES
+from rate_limit import scheduler, classify, is_rate_limited, RateLimitExhausted
+import metrics
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def github_headers():
+    """Default headers for the GitHub API; the token is chosen per call by the scheduler."""
+    return {"Accept": "application/vnd.github+json"}
+
+
+def lstm_headers():
+    """Default headers for the LSTM microservice."""
+    return {'content-type': 'application/json'}
+
+
+def host_key(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+# Default headers per upstream host
+HOST_HEADERS = {
+    host_key(GITHUB_API_BASE): github_headers,
+    host_key(LSTM_API_BASE): lstm_headers,
+}
+
+
+def create_session(host, pool_size=None):
+    """Build a session with a sized keep-alive pool and the host's default headers."""
+    pool_size = pool_size or HTTP_POOL_SIZE
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    default_headers = HOST_HEADERS.get(host)
+    if default_headers:
+        session.headers.update(default_headers())
+    return session
+
+
+def session_for(url):
+    """Return the shared session for the URL's host, creating it on first use."""
+    host = host_key(url)
+    session = _sessions.get(host)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(host)
+            if session is None:
+                session = _sessions[host] = create_session(host)
+    return session
+
+
+class CachedResponse:
+    """Body and validators of a previously successful GET."""
+
+    def __init__(self, response):
+        self.content = response.content
+        self.headers = dict(response.headers)
+        self.encoding = response.encoding
+        self.etag = response.headers.get("ETag")
+        self.last_modified = response.headers.get("Last-Modified")
+
+    @property
+    def size(self):
+        return len(self.content)
+
+    def validators(self):
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def to_response(self, not_modified):
+        """Rebuild a 200 response from the cache, keeping the fresh headers of the 304."""
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response._content = self.content
+        response.encoding = self.encoding
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.headers.update(not_modified.headers)
+        response.url = not_modified.url
+        response.request = not_modified.request
+        return response
+
+
+class ConditionalCache:
+    """Size-bounded LRU of GET responses keyed by the full request URL."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def store(self, key, response):
+        entry = CachedResponse(response)
+        if not (entry.etag or entry.last_modified) or entry.size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous.size
+            self._entries[key] = entry
+            self._size += entry.size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= evicted.size
+                self.evictions += 1
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+
+response_cache = ConditionalCache(HTTP_CACHE_MAX_BYTES)
+
+
+def cache_key(url, params=None):
+    """Identify a GET by its final URL; every pooled token belongs to the same deployment."""
+    return requests.Request("GET", url, params=params).prepare().url
+
+
+def send(session, method, url, **kwargs):
+    """Send a request on a pooled session, recording its latency and status."""
+    started = time.perf_counter()
+    status = "error"
+    try:
+        response = session.request(method, url, **kwargs)
+        status = response.status_code
+        return response
+    finally:
+        metrics.observe_upstream(url, status, time.perf_counter() - started)
+
+
+def rate_limited_response(url, error):
+    """Local 429 returned instead of spending a call that GitHub would reject."""
+    response = requests.Response()
+    response.status_code = 429
+    response.reason = "Too Many Requests"
+    response._content = str(error).encode()
+    response.headers = CaseInsensitiveDict({"Retry-After": str(max(0, int(error.retry_at - time.time())))})
+    response.url = url
+    return response
+
+
+def send_github(method, url, headers=None, **kwargs):
+    """Send a GitHub call with a scheduled token, retrying once per token when rate limited."""
+    session = session_for(url)
+    resource = classify(url)
+    for _ in scheduler.tokens:
+        try:
+            token = scheduler.acquire(resource)
+        except RateLimitExhausted as error:
+            print(error)
+            return rate_limited_response(url, error)
+
+        request_headers = dict(headers or {})
+        if token:
+            request_headers["Authorization"] = f"token {token}"
+        try:
+            response = send(session, method, url, headers=request_headers, **kwargs)
+        except Exception:
+            scheduler.release(token, resource)
+            raise
+        scheduler.update(token, resource, response)
+        if not is_rate_limited(response):
+            break
+    return response
+
+
+def is_github(url):
+    return host_key(url) == host_key(GITHUB_API_BASE)
+
+
+def get(url, params=None, headers=None, **kwargs):
+    if not is_github(url):
+        return send(session_for(url), "GET", url, params=params, headers=headers, **kwargs)
+    if not HTTP_CACHE_MAX_BYTES:
+        return send_github("GET", url, params=params, headers=headers, **kwargs)
+
+    key = cache_key(url, params)
+    entry = response_cache.lookup(key)
+    request_headers = dict(headers or {})
+    if entry is not None:
+        request_headers.update(entry.validators())
+
+    response = send_github("GET", url, params=params, headers=request_headers, **kwargs)
+    if response.status_code == 304 and entry is not None:
+        response_cache.record(hit=True)
+        return entry.to_response(response)
+
+    response_cache.record(hit=False)
+    if response.status_code == 200:
+        response_cache.store(key, response)
+    return response
+
+
+def post(url, **kwargs):
+    if is_github(url):
+        return send_github("POST", url, **kwargs)
+    return send(session_for(url), "POST", url, **kwargs)
+
+
+def warm(urls=(GITHUB_API_BASE, LSTM_API_BASE), timeout=5):
+    """Open a pooled connection to each upstream host ahead of the first request."""
+    for url in urls:
+        try:
+            session_for(url).head(url, timeout=timeout)
+        except requests.RequestException as error:
+            print(f"Could not pre-connect to {url}: {error}")
+
+
+def close_all():
+    """Close every pooled connection, e.g. after forking a worker process."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,167 @@
+# Adaptive, concurrent retrieval of created issues through the GitHub search API.
+#
+# Every window is first requested once to learn its `total_count`. Windows that fit under the
+# search API ceiling have their remaining pages fetched in parallel; windows above it are split
+# into smaller date (and, for single days, time) ranges which go through the same process.
+import math
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import date, datetime, time, timedelta
+
+from dateutil import relativedelta
+
+from settings import (GITHUB_API_BASE, DEFAULT_PER_PAGE, ISSUE_WINDOW_COUNT, ISSUE_FETCH_CONCURRENCY,
+                      SEARCH_RESULT_LIMIT)
+import http_client
+import metrics
+from issue_table import IssueTable
+
+
+def analysis_start(end_day=None, months=ISSUE_WINDOW_COUNT):
+    """First day covered by an analysis ending on `end_day`."""
+    return (end_day or date.today()) + relativedelta.relativedelta(months=-months)
+
+
+def build_calendar_windows(start_day, end_day):
+    """Build inclusive calendar-month ranges covering start_day..end_day, newest month first.
+
+    Each entry is `(month_key, (first_day, last_day))`, e.g. `("2024-05", (2024-05-01, 2024-05-31))`.
+    """
+    windows = []
+    month_first = end_day.replace(day=1)
+    while month_first >= start_day.replace(day=1):
+        month_last = month_first + relativedelta.relativedelta(months=1, days=-1)
+        windows.append((month_first.strftime("%Y-%m"), (month_first, month_last)))
+        month_first = month_first + relativedelta.relativedelta(months=-1)
+    return windows
+
+
+def split_window(window, parts=2):
+    """Split an inclusive window into up to `parts` contiguous sub-windows, or None if it can't shrink."""
+    start, end = window
+    if isinstance(start, datetime):
+        unit = timedelta(seconds=1)
+        span = int((end - start).total_seconds()) + 1
+    elif start == end:
+        # A single busy day: continue splitting on time of day
+        return split_window((datetime.combine(start, time.min), datetime.combine(start, time(23, 59, 59))), parts)
+    else:
+        unit = timedelta(days=1)
+        span = (end - start).days + 1
+
+    parts = min(parts, span)
+    if parts < 2:
+        return None
+
+    sub_windows = []
+    for index in range(parts):
+        first = start + unit * (span * index // parts)
+        last = start + unit * (span * (index + 1) // parts - 1)
+        sub_windows.append((first, last))
+    return sub_windows
+
+
+def format_bound(value):
+    """Render a window bound the way the search syntax expects it."""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%dT%H:%M:%S+00:00")
+    return value.isoformat()
+
+
+def parse_issue(issue):
+    """Reduce a search API item to the fields used by grouping and forecasting."""
+    return {
+        "issue_number": issue.get("number"),
+        "created_at": issue.get("created_at", "")[:10],
+        "closed_at": issue.get("closed_at", "")[:10] if issue.get("closed_at") else None,
+        "labels": [label.get("name") for label in issue.get("labels", [])],
+        "State": issue.get("state"),
+        "Author": issue.get("user", {}).get("login")
+    }
+
+
+def fetch_search_page(repository_name, window, page=1, qualifier="created"):
+    """Fetch one page of a window's search results; returns None when the request fails."""
+    start, end = window
+    params = {
+        "q": f"type:issue repo:{repository_name} {qualifier}:{format_bound(start)}..{format_bound(end)}",
+        "per_page": DEFAULT_PER_PAGE,
+        "page": page
+    }
+    response = http_client.get(f"{GITHUB_API_BASE}search/issues", params=params)
+    if response.status_code != 200:
+        return None
+    return response.json()
+
+
+def harvest_windows(repository_name, windows, qualifier="created", concurrency=None):
+    """Harvest every issue whose `qualifier` date falls in each window.
+
+    Returns `(issues_per_window, failed)`: one deduplicated issue list per input window, in
+    sub-window and page order, and the indexes of windows where at least one request failed.
+    The output is deterministic regardless of the order in which requests complete.
+    """
+    max_workers = max(1, concurrency or ISSUE_FETCH_CONCURRENCY)
+    max_pages = SEARCH_RESULT_LIMIT // DEFAULT_PER_PAGE
+    pages = {}
+    failed = set()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = {}
+
+        def submit(key, window, page):
+            future = pool.submit(metrics.in_context(fetch_search_page), repository_name, window, page, qualifier)
+            pending[future] = (key, window, page)
+
+        for index, window in enumerate(windows):
+            submit((index,), window, 1)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                key, window, page = pending.pop(future)
+                body = future.result()
+                if body is None:
+                    failed.add(key[0])
+                    continue
+
+                if page == 1:
+                    total_count = body.get("total_count", 0)
+                    if total_count > SEARCH_RESULT_LIMIT:
+                        # Aim straight for sub-windows that fit under the ceiling
+                        sub_windows = split_window(window, math.ceil(total_count / SEARCH_RESULT_LIMIT))
+                        if sub_windows:
+                            for position, sub_window in enumerate(sub_windows):
+                                submit(key + (position,), sub_window, 1)
+                            continue
+                    page_count = min(math.ceil(total_count / DEFAULT_PER_PAGE), max_pages)
+                    for next_page in range(2, page_count + 1):
+                        submit(key, window, next_page)
+
+                pages[(key, page)] = body.get("items", [])
+
+    issues_per_window = [[] for _ in windows]
+    seen_numbers = set()
+    for key, page in sorted(pages):
+        for issue in pages[(key, page)]:
+            # Sub-windows of a time-split day can share their boundary second
+            if issue.get("number") in seen_numbers:
+                continue
+            seen_numbers.add(issue.get("number"))
+            issues_per_window[key[0]].append(parse_issue(issue))
+
+    return issues_per_window, failed
+
+
+def fetch_repo_issues(repository_name, end_day=None, concurrency=None):
+    """Harvest every issue created in the analysis range, newest month first, without persistence.
+
+    Returns `(IssueTable, incomplete months)`, the latter listing the `YYYY-MM` months whose
+    search failed (e.g. rate limited), so their counts are missing rather than zero.
+    """
+    end_day = end_day or date.today()
+    start_day = analysis_start(end_day)
+    months, windows = zip(*build_calendar_windows(start_day, end_day))
+    issues_per_window, failed = harvest_windows(repository_name, windows, concurrency=concurrency)
+    issues = IssueTable.from_records(issue for issues in issues_per_window for issue in issues
+                                     if start_day.isoformat() <= issue["created_at"] <= end_day.isoformat())
+    return issues, sorted(months[index] for index in failed)
@@ -0,0 +1,231 @@
+# Persistent, incremental per-repository issue store backed by SQLite.
+#
+# Harvested issues are kept per repository and calendar month of creation. A month is fresh once
+# it has been synced after its last day, so only the open month (and months that were never
+# synced, or were invalidated) is searched again. Issues updated since the previous sync, e.g.
+# closed or relabelled ones in otherwise fresh months, are patched in place with one `updated:`
+# search instead of re-downloading their whole month. Repositories are keyed by their lowercased
+# name, since GitHub treats `Owner/Name` and `owner/name` as the same repository.
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from settings import ISSUE_STORE_PATH
+from issue_search import analysis_start, build_calendar_windows, harvest_windows, fetch_repo_issues
+from issue_table import IssueTable
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS issues (
+    repo TEXT NOT NULL,
+    issue_number INTEGER NOT NULL,
+    month TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    record TEXT NOT NULL,
+    PRIMARY KEY (repo, issue_number)
+);
+CREATE INDEX IF NOT EXISTS issues_by_month ON issues (repo, month, position);
+CREATE TABLE IF NOT EXISTS windows (
+    repo TEXT NOT NULL,
+    month TEXT NOT NULL,
+    synced_at TEXT NOT NULL,
+    PRIMARY KEY (repo, month)
+);
+CREATE TABLE IF NOT EXISTS repos (
+    repo TEXT PRIMARY KEY,
+    synced_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS commit_dates (
+    sha TEXT PRIMARY KEY,
+    committed_date TEXT NOT NULL
+);
+"""
+
+# Re-read a little before the previous sync so updates racing with it are not missed
+SYNC_OVERLAP = timedelta(minutes=5)
+# Stay well below SQLite's limit on bound parameters per statement
+LOOKUP_CHUNK = 500
+
+
+def repo_key(repo):
+    return repo.lower()
+
+
+class IssueStore:
+    """SQLite-backed issue storage with per-month freshness tracking."""
+
+    def __init__(self, path):
+        self.path = path
+        self._write_lock = threading.Lock()
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connection(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def window_sync_times(self, repo):
+        """Return {month: synced_at} for every stored month of a repository."""
+        repo = repo_key(repo)
+        with self._connection() as conn:
+            rows = conn.execute("SELECT month, synced_at FROM windows WHERE repo = ?", (repo,)).fetchall()
+        return {month: datetime.fromisoformat(synced_at) for month, synced_at in rows}
+
+    def last_sync(self, repo):
+        repo = repo_key(repo)
+        with self._connection() as conn:
+            row = conn.execute("SELECT synced_at FROM repos WHERE repo = ?", (repo,)).fetchone()
+        return datetime.fromisoformat(row[0]) if row else None
+
+    def replace_month(self, repo, month, issues, synced_at):
+        """Store the complete issue list of a month and mark it synced."""
+        repo = repo_key(repo)
+        with self._write_lock, self._connection() as conn:
+            conn.execute("DELETE FROM issues WHERE repo = ? AND month = ?", (repo, month))
+            conn.executemany(
+                "INSERT OR REPLACE INTO issues (repo, issue_number, month, position, record) VALUES (?, ?, ?, ?, ?)",
+                [(repo, issue["issue_number"], month, position, json.dumps(issue))
+                 for position, issue in enumerate(issues)])
+            conn.execute("INSERT OR REPLACE INTO windows (repo, month, synced_at) VALUES (?, ?, ?)",
+                         (repo, month, synced_at.isoformat()))
+
+    def patch_issues(self, repo, issues):
+        """Insert or update individual issues without touching the rest of their month."""
+        repo = repo_key(repo)
+        with self._write_lock, self._connection() as conn:
+            for issue in issues:
+                month = issue["created_at"][:7]
+                conn.execute(
+                    "INSERT INTO issues (repo, issue_number, month, position, record) VALUES (?, ?, ?, "
+                    "(SELECT COALESCE(MAX(position), -1) + 1 FROM issues WHERE repo = ? AND month = ?), ?) "
+                    "ON CONFLICT (repo, issue_number) DO UPDATE SET month = excluded.month, record = excluded.record",
+                    (repo, issue["issue_number"], month, repo, month, json.dumps(issue)))
+
+    def mark_synced(self, repo, synced_at):
+        repo = repo_key(repo)
+        with self._write_lock, self._connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO repos (repo, synced_at) VALUES (?, ?)", (repo, synced_at.isoformat()))
+
+    def load(self, repo, months, start_day=None, end_day=None):
+        """Return the stored issues of the given months as an `IssueTable`, newest month first, in harvest order.
+
+        Rows are decoded one at a time straight into the table, optionally keeping only issues
+        created between `start_day` and `end_day`.
+        """
+        repo = repo_key(repo)
+        months = sorted(months, reverse=True)
+        placeholders = ", ".join("?" for _ in months)
+        first = start_day.isoformat() if start_day else ""
+        last = end_day.isoformat() if end_day else "9999-12-31"
+        table = IssueTable()
+        with self._connection() as conn:
+            rows = conn.execute(
+                f"SELECT record FROM issues WHERE repo = ? AND month IN ({placeholders}) ORDER BY month DESC, position",
+                (repo, *months))
+            for record, in rows:
+                issue = json.loads(record)
+                if first <= issue["created_at"] <= last:
+                    table.append(issue)
+        return table
+
+    def commit_dates(self, shas):
+        """Return {sha: committed_date} for the commits already known."""
+        shas = list(shas)
+        dates = {}
+        with self._connection() as conn:
+            for start in range(0, len(shas), LOOKUP_CHUNK):
+                chunk = shas[start:start + LOOKUP_CHUNK]
+                placeholders = ", ".join("?" for _ in chunk)
+                dates.update(conn.execute(
+                    f"SELECT sha, committed_date FROM commit_dates WHERE sha IN ({placeholders})", chunk).fetchall())
+        return dates
+
+    def save_commit_dates(self, dates):
+        with self._write_lock, self._connection() as conn:
+            conn.executemany("INSERT OR REPLACE INTO commit_dates (sha, committed_date) VALUES (?, ?)", dates.items())
+
+    def invalidate(self, repo, month=None):
+        """Forget a repository (or one of its months) so the next sync fetches it again."""
+        repo = repo_key(repo)
+        with self._write_lock, self._connection() as conn:
+            if month is None:
+                conn.execute("DELETE FROM issues WHERE repo = ?", (repo,))
+                conn.execute("DELETE FROM windows WHERE repo = ?", (repo,))
+                conn.execute("DELETE FROM repos WHERE repo = ?", (repo,))
+            else:
+                conn.execute("DELETE FROM issues WHERE repo = ? AND month = ?", (repo, month))
+                conn.execute("DELETE FROM windows WHERE repo = ? AND month = ?", (repo, month))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the process-wide store, or None when persistence is disabled."""
+    global _store
+    if not ISSUE_STORE_PATH:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = IssueStore(ISSUE_STORE_PATH)
+    return _store
+
+
+def is_fresh(synced_at, window):
+    """A month never changes again once it has been synced after its last day."""
+    return synced_at is not None and synced_at.date() > window[1]
+
+
+def sync_repo_issues(repository_name, refresh=False, store=None):
+    """Bring the stored issues of a repository up to date and return the analysis range.
+
+    Returns `(IssueTable, incomplete months)` like `issue_search.fetch_repo_issues`: months that
+    could not be refreshed are listed even when an older copy of them is stored. Passing
+    `refresh=True` invalidates everything stored for the repository first.
+    """
+    store = store or get_store()
+    if store is None:
+        return fetch_repo_issues(repository_name)
+
+    if refresh:
+        store.invalidate(repository_name)
+
+    started_at = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    end_day = started_at.date()
+    start_day = analysis_start(end_day)
+    windows = build_calendar_windows(start_day, end_day)
+
+    # Refetch the open month and any month that was never completely synced
+    sync_times = store.window_sync_times(repository_name)
+    stale = [(month, window) for month, window in windows if not is_fresh(sync_times.get(month), window)]
+    incomplete_months = []
+    if stale:
+        issues_per_window, failed = harvest_windows(repository_name, [window for _, window in stale])
+        for index, (month, _) in enumerate(stale):
+            if index in failed:
+                incomplete_months.append(month)
+            else:
+                store.replace_month(repository_name, month, issues_per_window[index], started_at)
+
+    # Patch issues touched since the last sync in months that were not refetched
+    last_sync = store.last_sync(repository_name)
+    sync_complete = True
+    if last_sync is not None:
+        updated_window = (last_sync - SYNC_OVERLAP, started_at)
+        updated_issues, failed = harvest_windows(repository_name, [updated_window], qualifier="updated")
+        store.patch_issues(repository_name, updated_issues[0])
+        sync_complete = not failed
+    if sync_complete:
+        store.mark_synced(repository_name, started_at)
+
+    issues = store.load(repository_name, [month for month, _ in windows], start_day, end_day)
+    return issues, sorted(incomplete_months)
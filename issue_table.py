@@ -0,0 +1,142 @@
+# Compact, column-oriented container for harvested issues.
+#
+# A list of per-issue dicts costs several hundred bytes per issue: the dict itself, a labels
+# list, and a fresh copy of every date, author, state and label string. `IssueTable` keeps one
+# typed array per field instead (4 bytes per value): issue numbers, created and closed dates as
+# day ordinals, and ids into interned tables of authors, states and labels. Labels are stored as
+# one flat id array with per-issue offsets, and a label -> rows index is built on first use.
+#
+# Aggregation and compact forecast payloads read the columns directly; per-issue dicts in the
+# `parse_issue` shape are only produced on demand by `records()`, e.g. for the legacy forecast body.
+from array import array
+from collections import Counter
+from datetime import date
+
+# Day ordinal stored for a missing date
+NO_DAY = 0
+
+
+def day_ordinal(value):
+    return date.fromisoformat(value).toordinal() if value else NO_DAY
+
+
+_day_labels = {}
+
+
+def day_label(ordinal):
+    """ISO date of a day ordinal; the few hundred distinct days are converted once."""
+    label = _day_labels.get(ordinal)
+    if label is None:
+        label = _day_labels[ordinal] = date.fromordinal(ordinal).isoformat()
+    return label
+
+
+class Interned:
+    """Bidirectional string <-> id table; each distinct string is stored once."""
+
+    def __init__(self):
+        self.values = []
+        self.ids = {}
+
+    def id_of(self, value):
+        value_id = self.ids.get(value)
+        if value_id is None:
+            value_id = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return value_id
+
+    def __len__(self):
+        return len(self.values)
+
+
+class IssueTable:
+    """Columnar issue list, iterable as `parse_issue`-shaped dicts."""
+
+    def __init__(self):
+        self.numbers = array("i")
+        self.created = array("i")
+        self.closed = array("i")
+        self.states = array("i")
+        self.authors = array("i")
+        # Labels of row i are label_ids[label_offsets[i]:label_offsets[i + 1]]
+        self.label_ids = array("i")
+        self.label_offsets = array("i", [0])
+        self.state_names = Interned()
+        self.author_names = Interned()
+        self.label_names = Interned()
+        self._label_index = None
+
+    @classmethod
+    def from_records(cls, records):
+        table = cls()
+        table.extend(records)
+        return table
+
+    def append(self, issue):
+        """Add one issue given in the `issue_search.parse_issue` shape."""
+        self.numbers.append(issue.get("issue_number") or 0)
+        self.created.append(day_ordinal(issue.get("created_at")))
+        self.closed.append(day_ordinal(issue.get("closed_at")))
+        self.states.append(self.state_names.id_of(issue.get("State")))
+        self.authors.append(self.author_names.id_of(issue.get("Author")))
+        self.label_ids.extend(self.label_names.id_of(label) for label in issue.get("labels") or ())
+        self.label_offsets.append(len(self.label_ids))
+        self._label_index = None
+
+    def extend(self, records):
+        for issue in records:
+            self.append(issue)
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def count_days(self):
+        """Created and closed counts per ISO day, like `aggregation.count_days` for dicts."""
+        created_days, closed_days = Counter(self.created), Counter(self.closed)
+        created_days.pop(NO_DAY, None)
+        closed_days.pop(NO_DAY, None)
+        return ({day_label(day): count for day, count in created_days.items()},
+                {day_label(day): count for day, count in closed_days.items()})
+
+    def labels_of(self, row):
+        return [self.label_names.values[label_id]
+                for label_id in self.label_ids[self.label_offsets[row]:self.label_offsets[row + 1]]]
+
+    def label_index(self):
+        """Rows carrying each label, as `{label: array of row numbers}`."""
+        if self._label_index is None:
+            index = {}
+            for row in range(len(self)):
+                for label_id in self.label_ids[self.label_offsets[row]:self.label_offsets[row + 1]]:
+                    index.setdefault(label_id, array("i")).append(row)
+            self._label_index = {self.label_names.values[label_id]: rows for label_id, rows in index.items()}
+        return self._label_index
+
+    def rows_with_label(self, label):
+        return self.label_index().get(label, array("i"))
+
+    def select(self, rows):
+        """A new table holding the given rows, in that order."""
+        table = IssueTable()
+        for row in rows:
+            table.append(self.record(row))
+        return table
+
+    def record(self, row):
+        """Issue `row` as a `parse_issue`-shaped dict."""
+        created, closed = self.created[row], self.closed[row]
+        return {
+            "issue_number": self.numbers[row],
+            "created_at": day_label(created) if created else "",
+            "closed_at": day_label(closed) if closed else None,
+            "labels": self.labels_of(row),
+            "State": self.state_names.values[self.states[row]],
+            "Author": self.author_names.values[self.authors[row]]
+        }
+
+    def records(self):
+        """Materialize every issue as a dict; only for consumers that need the legacy shape."""
+        return [self.record(row) for row in range(len(self))]
+
+    def __iter__(self):
+        return (self.record(row) for row in range(len(self)))
@@ -0,0 +1,132 @@
+# In-process forecasts of the monthly activity series, a low-latency alternative to the LSTM service.
+#
+# Created issues, closed issues, pulls and branches are counted per calendar month over the
+# analysis window and extrapolated LOCAL_FORECAST_HORIZON months with Holt's damped-trend
+# exponential smoothing. The smoothing parameters are fitted by a grid search minimising the
+# one-step-ahead squared error. Only complete months are fitted; the first forecast month is the
+# current one. Fitted forecasts are cached per repository, series and series content hash.
+#
+# The models are plain Python on purpose: a series is a couple of dozen points and the whole
+# grid search takes a few milliseconds, so NumPy would add import time and image size for no gain.
+import hashlib
+import json
+import math
+import threading
+from collections import Counter, OrderedDict
+from datetime import date, timedelta
+
+from dateutil import relativedelta
+
+from aggregation import bucket_range, build_series
+from settings import LOCAL_FORECAST_HORIZON, LOCAL_FORECAST_CACHE_SIZE
+
+FORECAST_ENGINES = ("remote", "local", "auto")
+
+# Smoothing parameter grid: level (alpha), trend (beta) and trend damping (phi)
+ALPHAS = [step / 10 for step in range(1, 10)]
+BETAS = [step / 10 for step in range(1, 10)]
+PHIS = (0.8, 0.9, 0.98)
+
+_fitted = OrderedDict()
+_fitted_lock = threading.Lock()
+
+
+def holt_errors(values, alpha, beta, phi):
+    """Run damped Holt smoothing over `values`; returns `(level, trend, sum of squared one-step errors)`."""
+    level, trend = values[0], values[1] - values[0]
+    squared_errors = 0.0
+    for value in values[1:]:
+        expected = level + phi * trend
+        squared_errors += (value - expected) ** 2
+        previous_level = level
+        level = alpha * value + (1 - alpha) * expected
+        trend = beta * (level - previous_level) + (1 - beta) * phi * trend
+    return level, trend, squared_errors
+
+
+def forecast_values(values, horizon):
+    """Forecast `horizon` further points of a series; returns `(forecast, model)`."""
+    if len(values) < 3:
+        mean = sum(values) / len(values) if values else 0.0
+        return [round(mean, 2)] * horizon, {"name": "mean", "points": len(values)}
+
+    best = None
+    for alpha in ALPHAS:
+        for beta in BETAS:
+            for phi in PHIS:
+                level, trend, squared_errors = holt_errors(values, alpha, beta, phi)
+                if best is None or squared_errors < best[0]:
+                    best = (squared_errors, alpha, beta, phi, level, trend)
+
+    squared_errors, alpha, beta, phi, level, trend = best
+    forecast = []
+    damping = 0.0
+    for step in range(1, horizon + 1):
+        damping += phi ** step
+        # Counts can't go negative
+        forecast.append(round(max(0.0, level + damping * trend), 2))
+    model = {
+        "name": "holt-damped",
+        "alpha": alpha,
+        "beta": beta,
+        "phi": phi,
+        "rmse": round(math.sqrt(squared_errors / (len(values) - 1)), 3),
+        "points": len(values)
+    }
+    return forecast, model
+
+
+def monthly_counts(days, start, end):
+    """Counts of ISO dates per calendar month, zero-filled over start..end."""
+    counts = Counter(day[:7] for day in days if day)
+    return [counts.get(label, 0) for label in bucket_range(start, end, "monthly")]
+
+
+def series_hash(values):
+    return hashlib.sha256(json.dumps(values).encode()).hexdigest()
+
+
+def cached_forecast(repo_full_name, kind, values, horizon):
+    """Forecast a series, reusing the fit of an identical series of the same repository."""
+    key = (repo_full_name.lower(), kind, horizon, series_hash(values))
+    with _fitted_lock:
+        if key in _fitted:
+            _fitted.move_to_end(key)
+            return _fitted[key]
+
+    result = forecast_values(values, horizon)
+    with _fitted_lock:
+        _fitted[key] = result
+        while len(_fitted) > LOCAL_FORECAST_CACHE_SIZE:
+            _fitted.popitem(last=False)
+    return result
+
+
+def local_forecasts(repo_full_name, issues_data, pulls_info, branches_info, start, end=None,
+                    horizon=LOCAL_FORECAST_HORIZON):
+    """Forecast the created, closed, pulls and branches series of a repository.
+
+    Returns `{kind: {"granularity": "monthly", "labels": [...], "values": [...], "model": {...}}}`
+    where `labels` are the `horizon` months starting with the current one and `values` the
+    expected counts per month.
+    """
+    current_month = (end or date.today()).replace(day=1)
+    labels = bucket_range(current_month, current_month + relativedelta.relativedelta(months=horizon - 1), "monthly")
+
+    # The analysis usually starts mid-month and the current month is still incomplete, so only
+    # the whole months in between are fitted
+    complete_start = start if start.day == 1 else start.replace(day=1) + relativedelta.relativedelta(months=1)
+    complete_end = current_month - timedelta(days=1)
+    issue_series = build_series(issues_data, "monthly", complete_start, complete_end)
+    series = {
+        "created": issue_series["created"],
+        "closed": issue_series["closed"],
+        "pulls": monthly_counts((pull["created_at"] for pull in pulls_info or ()), complete_start, complete_end),
+        "branches": monthly_counts((branch["created_at"] for branch in branches_info or ()), complete_start, complete_end)
+    }
+
+    forecasts = {}
+    for kind, values in series.items():
+        forecast, model = cached_forecast(repo_full_name, kind, values, horizon)
+        forecasts[kind] = {"granularity": "monthly", "labels": labels, "values": forecast, "model": model}
+    return forecasts
@@ -0,0 +1,185 @@
+# Resilient client for the LSTM forecasting microservice.
+#
+# Every call has a connect and a read timeout, so a cold-starting or hung instance cannot pin a
+# worker. A circuit breaker counts consecutive failures (timeouts, connection errors, 5xx); once
+# open, calls fail fast with `LstmUnavailable` until a trial call after the reset delay succeeds.
+# Optionally, a call still running after the p95 latency of its endpoint is hedged: a duplicate
+# is sent and whichever answers first is used. Callers turn `LstmUnavailable` into null results.
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed
+
+import requests
+
+import http_client
+import metrics
+from settings import (LSTM_API_BASE, LSTM_CONNECT_TIMEOUT, LSTM_READ_TIMEOUT, LSTM_BREAKER_THRESHOLD,
+                      LSTM_BREAKER_RESET_SECONDS, LSTM_HEDGE_REQUESTS, LSTM_HEDGE_QUANTILE, LSTM_HEDGE_MIN_SAMPLES,
+                      FORECAST_CONCURRENCY)
+
+# Recent successful latencies kept per endpoint to estimate the hedge delay
+LATENCY_SAMPLES = 200
+
+
+class LstmUnavailable(Exception):
+    """The LSTM service did not answer: circuit open, timeout, connection error or 5xx."""
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures; after `reset_seconds` one trial call is let through."""
+
+    def __init__(self, threshold, reset_seconds):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.rejections = 0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.reset_seconds else "open"
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_seconds and not self._trial_running:
+                self._trial_running = True
+                return True
+            self.rejections += 1
+            return False
+
+    def record(self, success):
+        with self._lock:
+            self._trial_running = False
+            if success:
+                self.failures = 0
+                self.opened_at = None
+            else:
+                self.failures += 1
+                # A failed trial re-opens the circuit for another full reset delay
+                if self.opened_at is not None or self.failures >= self.threshold:
+                    self.opened_at = time.monotonic()
+            metrics.LSTM_CIRCUIT_OPEN.set(0 if self.opened_at is None else 1)
+
+
+class LatencyWindow:
+    """Sliding window of recent latencies per endpoint."""
+
+    def __init__(self, size=LATENCY_SAMPLES):
+        self.size = size
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, path, seconds):
+        with self._lock:
+            self._samples.setdefault(path, deque(maxlen=self.size)).append(seconds)
+
+    def quantile(self, path, fraction, min_samples):
+        """The `fraction` quantile of the endpoint's latencies, or None with too few samples."""
+        with self._lock:
+            samples = sorted(self._samples.get(path, ()))
+        if len(samples) < max(1, min_samples):
+            return None
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+class LstmClient:
+    def __init__(self, base_url, connect_timeout, read_timeout, breaker, hedge=False):
+        self.base_url = base_url
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.breaker = breaker
+        self.hedge = hedge
+        self.latencies = LatencyWindow()
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._hedge_pool = ThreadPoolExecutor(max_workers=2 * FORECAST_CONCURRENCY, thread_name_prefix="lstm-hedge")
+
+    def _send(self, method, path, kwargs):
+        started = time.perf_counter()
+        send = http_client.post if method == "POST" else http_client.get
+        response = send(f"{self.base_url}{path}", **kwargs)
+        if response.status_code < 500:
+            self.latencies.add(path, time.perf_counter() - started)
+        return response
+
+    def _send_hedged(self, method, path, kwargs):
+        primary = self._hedge_pool.submit(metrics.in_context(self._send), method, path, kwargs)
+        delay = self.latencies.quantile(path, LSTM_HEDGE_QUANTILE, LSTM_HEDGE_MIN_SAMPLES)
+        if delay is None or wait([primary], timeout=delay).done:
+            return primary.result()
+
+        self.hedges += 1
+        hedge = self._hedge_pool.submit(metrics.in_context(self._send), method, path, kwargs)
+        response, error = None, None
+        # The slower copy is left to finish in the background; its answer is dropped
+        for future in as_completed([primary, hedge]):
+            try:
+                response = future.result()
+            except requests.RequestException as request_error:
+                error = request_error
+                continue
+            if response.status_code < 500:
+                winner = "hedge" if future is hedge else "primary"
+                self.hedge_wins += winner == "hedge"
+                metrics.LSTM_HEDGED.labels(winner).inc()
+                return response
+        if response is None:
+            raise error
+        return response
+
+    def request(self, method, path, timeout=None, **kwargs):
+        """Send a call and return its response (any status below 500), or raise `LstmUnavailable`."""
+        if not self.breaker.allow():
+            raise LstmUnavailable(f"LSTM circuit open, not calling {path}")
+        kwargs["timeout"] = (self.connect_timeout, min(timeout or self.read_timeout, self.read_timeout))
+        try:
+            response = self._send_hedged(method, path, kwargs) if self.hedge else self._send(method, path, kwargs)
+        except requests.RequestException as error:
+            self.breaker.record(success=False)
+            raise LstmUnavailable(f"LSTM call to {path} failed: {error}") from error
+        except BaseException:
+            # Anything else still counts as a failure, or a half-open trial would never finish
+            self.breaker.record(success=False)
+            raise
+        if response.status_code >= 500:
+            self.breaker.record(success=False)
+            raise LstmUnavailable(f"LSTM call to {path} returned HTTP {response.status_code}")
+        self.breaker.record(success=True)
+        return response
+
+    def post_json(self, path, body, timeout=None):
+        """POST a body and return the JSON answer, or None when the call failed in any way."""
+        try:
+            response = self.request("POST", path, json=body, timeout=timeout)
+        except LstmUnavailable as error:
+            print(error)
+            return None
+        if response.status_code != 200:
+            print(f"LSTM call to {path} returned HTTP {response.status_code}")
+            return None
+        try:
+            return response.json()
+        except ValueError:
+            print(f"LSTM call to {path} returned a non-JSON body")
+            return None
+
+    def stats(self):
+        return {
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "rejected_calls": self.breaker.rejections,
+            "hedging": self.hedge,
+            "hedged_calls": self.hedges,
+            "hedge_wins": self.hedge_wins
+        }
+
+
+lstm = LstmClient(LSTM_API_BASE, LSTM_CONNECT_TIMEOUT, LSTM_READ_TIMEOUT,
+                  CircuitBreaker(LSTM_BREAKER_THRESHOLD, LSTM_BREAKER_RESET_SECONDS), hedge=LSTM_HEDGE_REQUESTS)
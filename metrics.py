@@ -0,0 +1,203 @@
+# Prometheus metrics, Server-Timing breakdowns and opt-in request profiling.
+#
+# Every route records its latency and status code, and every upstream call its latency and
+# status per upstream and call type (GitHub search, pulls, branches, ..., LSTM endpoint). The
+# rate-limit scheduler's budgets are exported as gauges at scrape time. Within a request, the
+# pipeline stages (`stage()`) and upstream calls are also summed into a per-request `Timings`
+# that is returned as a `Server-Timing` header. Worker threads count towards the request that
+# started them when their work is submitted through `in_context`.
+#
+# Under gunicorn, set PROMETHEUS_MULTIPROC_DIR to an empty directory so /metrics aggregates the
+# histograms and counters of every worker process.
+import contextvars
+import cProfile
+import functools
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from flask import request, g, Response
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from settings import GITHUB_API_BASE, LSTM_API_BASE, PROFILE_REQUESTS, PROFILE_DIR
+from rate_limit import scheduler
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "Time to produce a response, by route.",
+                            ["route", "method"], buckets=LATENCY_BUCKETS)
+REQUEST_COUNT = Counter("http_requests", "Responses sent, by route and status code.", ["route", "method", "status"])
+STAGE_LATENCY = Histogram("analysis_stage_duration_seconds", "Time spent in each analysis stage.",
+                          ["stage"], buckets=LATENCY_BUCKETS)
+UPSTREAM_LATENCY = Histogram("upstream_request_duration_seconds", "Latency of outgoing calls, by upstream and call type.",
+                             ["upstream", "call"], buckets=LATENCY_BUCKETS)
+LSTM_CIRCUIT_OPEN = Gauge("lstm_circuit_open", "1 while the LSTM circuit breaker fails calls fast.")
+LSTM_HEDGED = Counter("lstm_hedged_requests", "LSTM calls duplicated after the hedge delay, by which copy answered first.",
+                      ["winner"])
+UPSTREAM_RESPONSES = Counter("upstream_responses", "Outgoing call outcomes, by upstream, call type and status code.",
+                             ["upstream", "call", "status"])
+
+# GitHub call types, matched against the path below GITHUB_API_BASE
+GITHUB_CALLS = [
+    ("graphql", re.compile(r"graphql/?$")),
+    ("search", re.compile(r"search/")),
+    ("pulls", re.compile(r"repos/[^/]+/[^/]+/pulls")),
+    ("branches", re.compile(r"repos/[^/]+/[^/]+/branches")),
+    ("repository", re.compile(r"repos/[^/]+/[^/]+/?$")),
+]
+
+_timings = contextvars.ContextVar("timings", default=None)
+# cProfile can only profile one request at a time
+_profile_lock = threading.Lock()
+
+
+def upstream_call(url):
+    """Return the `(upstream, call type)` labels of an outgoing URL."""
+    if url.startswith(GITHUB_API_BASE):
+        path = url[len(GITHUB_API_BASE):].split("?")[0]
+        for call, pattern in GITHUB_CALLS:
+            if pattern.match(path):
+                return "github", call
+        return "github", "other"
+    if url.startswith(LSTM_API_BASE):
+        return "lstm", urlsplit(url).path.removeprefix("/api/") or "root"
+    return "other", urlsplit(url).netloc
+
+
+class Timings:
+    """Durations collected during one request, summed per stage or upstream call type."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self._lock:
+            total, count = self._entries.get(name, (0.0, 0))
+            self._entries[name] = (total + seconds, count + 1)
+
+    def header(self, total_seconds):
+        """Render as a Server-Timing value; calls made in parallel are summed, so they can exceed the total."""
+        with self._lock:
+            entries = list(self._entries.items())
+        parts = [f'{name};dur={seconds * 1000:.1f}' + (f';desc="{count} calls"' if count > 1 else "")
+                 for name, (seconds, count) in entries]
+        parts.append(f"total;dur={total_seconds * 1000:.1f}")
+        return ", ".join(parts)
+
+
+def record(name, seconds):
+    timings = _timings.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+@contextmanager
+def stage(name):
+    """Time a block of the analysis pipeline."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        STAGE_LATENCY.labels(name).observe(seconds)
+        record(name, seconds)
+
+
+def observe_upstream(url, status, seconds):
+    """Record one outgoing call; `status` is the response code or "error" when no response came back."""
+    upstream, call = upstream_call(url)
+    UPSTREAM_LATENCY.labels(upstream, call).observe(seconds)
+    UPSTREAM_RESPONSES.labels(upstream, call, str(status)).inc()
+    record(f"{upstream}-{call.replace('/', '-')}", seconds)
+
+
+def in_context(fn):
+    """Wrap `fn` to run in a copy of the caller's context, e.g. before submitting it to a thread pool."""
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+class RateLimitCollector:
+    """Exports the scheduler's budget per token (by position) and resource when scraped."""
+
+    def collect(self):
+        labels = ["token", "resource"]
+        remaining = GaugeMetricFamily("github_rate_limit_remaining", "Calls left in the current window.", labels=labels)
+        limit = GaugeMetricFamily("github_rate_limit_limit", "Calls allowed per window.", labels=labels)
+        reset = GaugeMetricFamily("github_rate_limit_reset_timestamp_seconds", "When the window resets.", labels=labels)
+        for bucket in scheduler.snapshot():
+            bucket_labels = [str(bucket["token"]), bucket["resource"]]
+            remaining.add_metric(bucket_labels, bucket["remaining"])
+            limit.add_metric(bucket_labels, bucket["limit"])
+            reset.add_metric(bucket_labels, bucket["reset_at"])
+        yield remaining
+        yield limit
+        yield reset
+        yield CounterMetricFamily("github_rate_limit_waits", "Calls that waited for a reset.", value=scheduler.waits)
+        yield CounterMetricFamily("github_rate_limit_rejections", "Calls failed fast with a local 429.",
+                                  value=scheduler.rejections)
+
+
+REGISTRY.register(RateLimitCollector())
+
+
+def wants_profile():
+    return PROFILE_REQUESTS and (request.headers.get("X-Profile") == "1" or request.args.get("profile") == "1")
+
+
+def start_request():
+    _timings.set(Timings())
+    g.profiler = None
+    if wants_profile() and _profile_lock.acquire(blocking=False):
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+
+def finish_request(response):
+    timings = _timings.get()
+    if timings is None:
+        return response
+    seconds = time.perf_counter() - timings.started
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    REQUEST_LATENCY.labels(route, request.method).observe(seconds)
+    REQUEST_COUNT.labels(route, request.method, str(response.status_code)).inc()
+    response.headers["Server-Timing"] = timings.header(seconds)
+    response.headers["Timing-Allow-Origin"] = "*"
+
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+        _profile_lock.release()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{datetime.now():%Y%m%d-%H%M%S-%f}-{request.endpoint}.prof")
+        profiler.dump_stats(path)
+        response.headers["X-Profile-File"] = path
+    _timings.set(None)
+    return response
+
+
+def metrics_view():
+    registry = REGISTRY
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Histograms and counters of all workers; rate-limit budgets are those of the worker scraped
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(RateLimitCollector())
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+def init_app(app):
+    """Time every request and serve the metrics at /metrics.
+
+    Register before other after_request hooks (e.g. compression) so their time is included.
+    """
+    app.before_request(start_request)
+    app.after_request(finish_request)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
@@ -0,0 +1,148 @@
+# Rate-limit-aware scheduling of GitHub API calls across a pool of tokens.
+#
+# GitHub meters the core REST API, the search API and GraphQL separately, per token. The
+# scheduler keeps one bucket per (token, resource), starting from GitHub's documented limits and
+# corrected from the X-RateLimit-* headers of every response. Each call reserves budget from the
+# token with the most remaining for its resource; when every token is exhausted the call waits
+# for the earliest reset, or fails fast if that is further away than RATE_LIMIT_MAX_WAIT.
+# Reservations stay in flight until their response arrives; the budget is then the lowest
+# remaining count GitHub reported in the window minus the calls still in flight, so calls GitHub
+# did not charge for (304s) and calls that never reached it (transport errors) are given back.
+import threading
+import time
+
+from settings import GITHUB_TOKENS, RATE_LIMIT_MAX_WAIT
+
+# (limit, window in seconds) per resource before GitHub has reported the real values
+AUTHENTICATED_LIMITS = {"core": (5000, 3600), "search": (30, 60), "graphql": (5000, 3600)}
+ANONYMOUS_LIMITS = {"core": (60, 3600), "search": (10, 60), "graphql": (0, 3600)}
+
+
+class RateLimitExhausted(Exception):
+    """No token has budget left for a resource within the allowed wait."""
+
+    def __init__(self, resource, retry_at):
+        super().__init__(f"GitHub {resource} rate limit exhausted until {time.ctime(retry_at)}")
+        self.resource = resource
+        self.retry_at = retry_at
+
+
+class Bucket:
+    """Remaining budget of one token for one resource."""
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self.remaining = limit
+        self.reset_at = time.time() + window
+        self.in_flight = 0
+        # Lowest X-RateLimit-Remaining seen in the current window; responses arrive out of order
+        self.reported = None
+
+    def refill_if_reset(self, now):
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.window
+            self.reported = None
+
+
+def classify(url):
+    """Rate-limit resource a GitHub API URL is metered against."""
+    if url.rstrip("/").endswith("/graphql"):
+        return "graphql"
+    if "/search/" in url:
+        return "search"
+    return "core"
+
+
+class RateLimitScheduler:
+    def __init__(self, tokens, max_wait=RATE_LIMIT_MAX_WAIT):
+        self.tokens = list(tokens) or [None]
+        self.max_wait = max_wait
+        self._buckets = {}
+        for token in self.tokens:
+            limits = AUTHENTICATED_LIMITS if token else ANONYMOUS_LIMITS
+            for resource, (limit, window) in limits.items():
+                self._buckets[(token, resource)] = Bucket(limit, window)
+        self._condition = threading.Condition()
+        self.waits = 0
+        self.rejections = 0
+
+    def acquire(self, resource):
+        """Reserve one call on the token with the most budget left, waiting for a reset if needed."""
+        deadline = time.time() + self.max_wait
+        with self._condition:
+            while True:
+                now = time.time()
+                buckets = [(token, self._buckets[(token, resource)]) for token in self.tokens]
+                for _, bucket in buckets:
+                    bucket.refill_if_reset(now)
+
+                token, bucket = max(buckets, key=lambda item: item[1].remaining)
+                if bucket.remaining > 0:
+                    bucket.remaining -= 1
+                    bucket.in_flight += 1
+                    return token
+
+                retry_at = min(bucket.reset_at for _, bucket in buckets)
+                if retry_at > deadline:
+                    self.rejections += 1
+                    raise RateLimitExhausted(resource, retry_at)
+                self.waits += 1
+                self._condition.wait(timeout=retry_at - now)
+
+    def release(self, token, resource):
+        """Give back a reservation whose call never reached GitHub (e.g. a transport error)."""
+        with self._condition:
+            bucket = self._buckets[(token, resource)]
+            bucket.in_flight = max(0, bucket.in_flight - 1)
+            bucket.remaining = min(bucket.limit, bucket.remaining + 1)
+            self._condition.notify_all()
+
+    def update(self, token, resource, response):
+        """Settle the reservation of an answered call and learn the real budget from its headers."""
+        headers = response.headers
+        with self._condition:
+            reserved = self._buckets[(token, resource)]
+            reserved.in_flight = max(0, reserved.in_flight - 1)
+            bucket = self._buckets.get((token, headers.get("X-RateLimit-Resource", resource)))
+            if bucket is None:
+                return
+            if "X-RateLimit-Remaining" in headers:
+                bucket.limit = int(headers.get("X-RateLimit-Limit", bucket.limit))
+                reported = int(headers["X-RateLimit-Remaining"])
+                reset_at = float(headers.get("X-RateLimit-Reset", bucket.reset_at))
+                if reset_at == bucket.reset_at and bucket.reported is not None:
+                    reported = min(bucket.reported, reported)
+                bucket.reported = reported
+                bucket.reset_at = reset_at
+                bucket.remaining = max(0, reported - bucket.in_flight)
+            elif response.status_code == 304 and bucket is reserved:
+                # Not charged by GitHub
+                bucket.remaining = min(bucket.limit, bucket.remaining + 1)
+            if is_rate_limited(response):
+                # Secondary limits report budget left but ask us to back off
+                bucket.remaining = 0
+                retry_after = headers.get("Retry-After")
+                if retry_after and retry_after.isdigit():
+                    bucket.reset_at = max(bucket.reset_at, time.time() + int(retry_after))
+            self._condition.notify_all()
+
+    def snapshot(self):
+        """Current budget per token (identified by position) and resource."""
+        with self._condition:
+            return [
+                {"token": self.tokens.index(token), "resource": resource, "limit": bucket.limit,
+                 "remaining": bucket.remaining, "reset_at": int(bucket.reset_at)}
+                for (token, resource), bucket in self._buckets.items()
+            ]
+
+
+def is_rate_limited(response):
+    if response.status_code == 429:
+        return True
+    return response.status_code == 403 and (
+        response.headers.get("X-RateLimit-Remaining") == "0" or "Retry-After" in response.headers)
+
+
+scheduler = RateLimitScheduler(GITHUB_TOKENS)
@@ -0,0 +1,96 @@
+# Pull request and branch activity used by the pulls and branches forecasts.
+#
+# Both listings are paginated: the first page is fetched alone to read the page count from its
+# `Link: rel="last"` header, then the remaining pages are fetched a few at a time and parsed in
+# page order as they arrive, so only the compact rows are kept, never the raw pages. Pulls are
+# listed newest first and reading stops at the first page reaching past the analysis window.
+# Branches are dated by their head commit (see branch_dates).
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from urllib.parse import urlsplit, parse_qs
+
+import http_client
+import metrics
+from settings import GITHUB_API_BASE, DEFAULT_PER_PAGE, ACTIVITY_PAGE_CONCURRENCY, ACTIVITY_MAX_PAGES
+from issue_search import analysis_start
+from branch_dates import commit_dates
+
+
+def last_page(response):
+    """Page count announced by the Link header, 1 when there is no further page."""
+    last_url = response.links.get("last", {}).get("url")
+    if not last_url:
+        return 1
+    return int(parse_qs(urlsplit(last_url).query).get("page", ["1"])[0])
+
+
+def fetch_page(url, params, page):
+    """Fetch one page of a listing; returns `(response, items)`, items None when the request failed."""
+    response = http_client.get(url, params=dict(params, per_page=DEFAULT_PER_PAGE, page=page))
+    if response.status_code != 200:
+        print(f"Failed to retrieve page {page} of {url}: HTTP {response.status_code}")
+        return response, None
+    return response, response.json()
+
+
+def iter_pages(url, params, parse_page, concurrency=None, max_pages=None):
+    """Yield the parsed rows of every page of a listing, in page order.
+
+    `parse_page(items)` returns `(rows, more)`; `more=False` stops the listing after that page
+    and discards pages already in flight. A failed page ends the listing early.
+    """
+    concurrency = max(1, concurrency or ACTIVITY_PAGE_CONCURRENCY)
+    response, items = fetch_page(url, params, 1)
+    if items is None:
+        return
+    rows, more = parse_page(items)
+    yield from rows
+    if not more:
+        return
+
+    pages = iter(range(2, min(last_page(response), max_pages or ACTIVITY_MAX_PAGES) + 1))
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        in_flight = deque(pool.submit(metrics.in_context(fetch_page), url, params, page)
+                          for page in islice(pages, concurrency))
+        while in_flight:
+            _, items = in_flight.popleft().result()
+            if items is None:
+                break
+            rows, more = parse_page(items)
+            yield from rows
+            if not more:
+                break
+            for page in islice(pages, 1):
+                in_flight.append(pool.submit(metrics.in_context(fetch_page), url, params, page))
+        for future in in_flight:
+            future.cancel()
+
+
+def retrieve_pull_requests(repository_name, since=None):
+    """Fetch the pull requests of a GitHub repository created since the start of the analysis window."""
+    since = (since or analysis_start()).isoformat()
+
+    def parse_pulls(items):
+        rows = [{"pull_number": pull.get("number"), "created_at": pull.get("created_at", "")[:10]} for pull in items]
+        in_window = [row for row in rows if row["created_at"] >= since]
+        # Newest first: a page reaching past the window is the last one needed
+        return in_window, bool(items) and len(in_window) == len(rows)
+
+    pulls_api_url = f"{GITHUB_API_BASE}repos/{repository_name}/pulls"
+    params = {"state": "all", "sort": "created", "direction": "desc"}
+    return list(iter_pages(pulls_api_url, params, parse_pulls))
+
+
+def list_repo_branches(repository_name):
+    """Retrieve all branches for a given GitHub repository, dated by their head commit.
+
+    Branches whose head commit could not be resolved are left out rather than given a made-up date.
+    """
+    def parse_branches(items):
+        return [(branch.get("name"), (branch.get("commit") or {}).get("sha")) for branch in items], True
+
+    branches_api_url = f"{GITHUB_API_BASE}repos/{repository_name}/branches"
+    branches = list(iter_pages(branches_api_url, {}, parse_branches))
+    dates = commit_dates(repository_name, [sha for _, sha in branches if sha])
+    return [{"branch_name": name, "created_at": dates[sha]} for name, sha in branches if sha in dates]
@@ -0,0 +1,68 @@
+# Batched star and fork counts through the GitHub GraphQL API.
+#
+# One aliased query returns the counts of up to GRAPHQL_BATCH_SIZE repositories, and results are
+# shared between the star and fork dashboards for REPO_STATS_TTL seconds.
+import threading
+import time
+
+import http_client
+from settings import GITHUB_GRAPHQL_URL, GRAPHQL_BATCH_SIZE, REPO_STATS_TTL
+
+_stats_cache = {}
+_stats_lock = threading.Lock()
+
+
+def build_stats_query(repositories):
+    """Build one aliased query (and its variables) for a chunk of `owner/name` repositories."""
+    declarations, fields, variables = [], [], {}
+    for index, repository in enumerate(repositories):
+        owner, name = repository.split("/", 1)
+        declarations.append(f"$owner{index}: String!, $name{index}: String!")
+        fields.append(f"repo{index}: repository(owner: $owner{index}, name: $name{index}) {{ stargazerCount forkCount }}")
+        variables[f"owner{index}"] = owner
+        variables[f"name{index}"] = name
+    query = f"query({', '.join(declarations)}) {{ {' '.join(fields)} }}"
+    return query, variables
+
+
+def fetch_stats_chunk(repositories):
+    """Fetch one chunk; repositories that could not be resolved report zero counts."""
+    query, variables = build_stats_query(repositories)
+    response = http_client.post(GITHUB_GRAPHQL_URL, json={"query": query, "variables": variables})
+    if response.status_code != 200:
+        return None
+
+    data = response.json().get("data") or {}
+    stats = {}
+    for index, repository in enumerate(repositories):
+        node = data.get(f"repo{index}") or {}
+        stats[repository] = {"stars": node.get("stargazerCount", 0), "forks": node.get("forkCount", 0)}
+    return stats
+
+
+def fetch_repo_stats(repositories, force=False):
+    """Return `({repository: {"stars": n, "forks": n}}, complete)`, served from cache when fresh.
+
+    `complete` is False when a chunk failed and its repositories report zero counts. `force`
+    skips the cache and always queries GitHub.
+    """
+    key = tuple(repositories)
+    with _stats_lock:
+        cached = _stats_cache.get(key)
+        if cached and not force and time.monotonic() - cached[0] < REPO_STATS_TTL:
+            return cached[1], True
+
+        stats = {}
+        complete = True
+        for start in range(0, len(repositories), GRAPHQL_BATCH_SIZE):
+            chunk_stats = fetch_stats_chunk(repositories[start:start + GRAPHQL_BATCH_SIZE])
+            if chunk_stats is None:
+                complete = False
+                chunk_stats = {repository: {"stars": 0, "forks": 0}
+                               for repository in repositories[start:start + GRAPHQL_BATCH_SIZE]}
+            stats.update(chunk_stats)
+
+        # Failed lookups are retried on the next call instead of being cached
+        if complete:
+            _stats_cache[key] = (time.monotonic(), stats)
+        return stats, complete
@@ -0,0 +1,187 @@
+# Full-response cache for /api/github with TTL and stale-while-revalidate.
+#
+# Entries younger than RESPONSE_CACHE_TTL are served as they are. Older entries, up to
+# RESPONSE_CACHE_STALE_SECONDS past their TTL, are still served immediately while one background
+# refresh recomputes them. Callers can reject degraded values (e.g. analyses whose forecasts
+# failed), which are then recomputed next time instead of being served for the whole TTL.
+# The storage backend is pluggable: an in-process LRU (default), a local SQLite file, or Redis
+# so that several Cloud Run instances share one cache.
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+
+from settings import (RESPONSE_CACHE_BACKEND, RESPONSE_CACHE_TTL, RESPONSE_CACHE_STALE_SECONDS,
+                      RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_PATH, REDIS_URL)
+
+
+class MemoryBackend:
+    """In-process LRU bounded by entry count."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, stored_at, value, expires_in):
+        with self._lock:
+            self._entries[key] = (stored_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class DiskBackend:
+    """SQLite file shared by the worker processes of one instance."""
+
+    def __init__(self, path):
+        self.path = path
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS responses "
+                         "(key TEXT PRIMARY KEY, stored_at REAL NOT NULL, expires_at REAL NOT NULL, value TEXT NOT NULL)")
+
+    def get(self, key):
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn:
+            row = conn.execute("SELECT stored_at, value FROM responses WHERE key = ? AND expires_at > ?",
+                               (key, time.time())).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def set(self, key, stored_at, value, expires_in):
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn, conn:
+            conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+            conn.execute("INSERT OR REPLACE INTO responses (key, stored_at, expires_at, value) VALUES (?, ?, ?, ?)",
+                         (key, stored_at, stored_at + expires_in, json.dumps(value)))
+
+
+class RedisBackend:
+    """Redis (or any Redis-compatible store) shared across instances; requires the `redis` package."""
+
+    def __init__(self, url, prefix="gcp-flask:response:"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        return entry["stored_at"], entry["value"]
+
+    def set(self, key, stored_at, value, expires_in):
+        self.client.set(self.prefix + key, json.dumps({"stored_at": stored_at, "value": value}), ex=max(1, int(expires_in)))
+
+
+def create_backend(name=RESPONSE_CACHE_BACKEND):
+    if name == "none":
+        return None
+    if name == "disk":
+        return DiskBackend(RESPONSE_CACHE_PATH)
+    if name == "redis":
+        return RedisBackend(REDIS_URL)
+    if name == "memory":
+        return MemoryBackend(RESPONSE_CACHE_MAX_ENTRIES)
+    raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND {name!r}")
+
+
+class ResponseCache:
+    def __init__(self, backend, ttl=RESPONSE_CACHE_TTL, stale_seconds=RESPONSE_CACHE_STALE_SECONDS):
+        self.backend = backend
+        self.ttl = ttl
+        self.stale_seconds = stale_seconds
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def _count(self, status):
+        with self._lock:
+            if status == "hit":
+                self.hits += 1
+            elif status == "stale":
+                self.stale_hits += 1
+            else:
+                self.misses += 1
+
+    def store(self, key, value):
+        if self.backend is not None:
+            self.backend.set(key, time.time(), value, self.ttl + self.stale_seconds)
+
+    def _revalidate(self, key, compute, cacheable):
+        try:
+            value = compute()
+            if cacheable(value):
+                self.store(key, value)
+        except Exception as error:
+            print(f"Background refresh of {key} failed: {error}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def peek(self, key):
+        """Return the value if it is fresh, else None; never computes or revalidates."""
+        if self.backend is not None:
+            entry = self.backend.get(key)
+            if entry is not None and time.time() - entry[0] < self.ttl:
+                self._count("hit")
+                return entry[1]
+        return None
+
+    def fetch(self, key, compute, bypass=False, cacheable=lambda value: True):
+        """Return `(value, status)` with status "hit", "stale" or "miss".
+
+        `bypass` skips the lookup but still stores the freshly computed value. Exceptions from
+        `compute` propagate and nothing is stored, nor are values `cacheable` rejects.
+        """
+        if self.backend is not None and not bypass:
+            entry = self.backend.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                age = time.time() - stored_at
+                if age < self.ttl:
+                    self._count("hit")
+                    return value, "hit"
+                if age < self.ttl + self.stale_seconds:
+                    with self._lock:
+                        start_refresh = key not in self._refreshing
+                        self._refreshing.add(key)
+                    if start_refresh:
+                        threading.Thread(target=self._revalidate, args=(key, compute, cacheable), daemon=True).start()
+                    self._count("stale")
+                    return value, "stale"
+
+        value = compute()
+        if cacheable(value):
+            self.store(key, value)
+        self._count("miss")
+        return value, "miss"
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": type(self.backend).__name__ if self.backend else None,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "refreshing": len(self._refreshing)
+            }
+
+
+def cache_key(repository, **options):
+    """Stable key for a repository and the query options that change the response."""
+    return json.dumps({"repository": repository.lower(), **options}, sort_keys=True)
+
+
+analysis_cache = ResponseCache(create_backend())
@@ -0,0 +1,92 @@
+# Fast JSON serialization and negotiated response compression for every route.
+#
+# orjson and Brotli are optional: without orjson Flask's default JSON provider is kept, and
+# without Brotli only gzip is offered.
+import gzip
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+from settings import COMPRESSION_MIN_BYTES, GZIP_LEVEL, BROTLI_QUALITY
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, with the default provider's fallbacks for other types.
+
+    `jsonify` goes through `response()`, which encodes straight to bytes: compact, or indented
+    like the default provider in debug mode.
+    """
+
+    def encode(self, obj, indent=False, newline=False):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if newline:
+            option |= orjson.OPT_APPEND_NEWLINE
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        # orjson only writes compact output or a two-space indent; anything else goes to json.dumps
+        indent = kwargs.pop("indent", None)
+        separators = kwargs.pop("separators", None)
+        if kwargs or indent not in (None, 2) or separators not in (None, (",", ":")):
+            return super().dumps(obj, indent=indent, separators=separators, **kwargs)
+        return self.encode(obj, indent=indent == 2).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.encode(obj, indent=indent, newline=True), mimetype=self.mimetype)
+
+
+def supported_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def compress_response(response):
+    """Compress buffered responses above the size threshold with the client's preferred encoding."""
+    if (response.direct_passthrough or response.is_streamed or response.status_code in (204, 304)
+            or "Content-Encoding" in response.headers):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    data = response.get_data()
+    if len(data) < COMPRESSION_MIN_BYTES:
+        return response
+    encoding = request.accept_encodings.best_match(supported_encodings())
+    if encoding is None:
+        return response
+
+    response.set_data(compress(data, encoding))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def init_app(app):
+    """Install the fast JSON provider (when orjson is available) and response compression."""
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+    app.after_request(compress_response)
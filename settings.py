@@ -0,0 +1,124 @@
+# Shared configuration for the Flask microservice.
+# Values can be overridden through environment variables on Cloud Run.
+import os
+import tempfile
+
+# GitHub API root and paging; the base URL can point at a GitHub Enterprise or stub server
+GITHUB_API_BASE = os.getenv('GITHUB_API_BASE', "https://api.github.com/").rstrip("/") + "/"
+GITHUB_GRAPHQL_URL = f"{GITHUB_API_BASE}graphql"
+DEFAULT_PER_PAGE = 100
+
+# Issue harvesting: months of history analysed and how many search requests run at once
+ISSUE_WINDOW_COUNT = 24
+ISSUE_FETCH_CONCURRENCY = int(os.getenv('ISSUE_FETCH_CONCURRENCY', '8'))
+
+# The search API never returns more than this many results for a single query
+SEARCH_RESULT_LIMIT = 1000
+
+# Pull request and branch listings: pages fetched at once after the first, and the most pages read
+ACTIVITY_PAGE_CONCURRENCY = int(os.getenv('ACTIVITY_PAGE_CONCURRENCY', '4'))
+ACTIVITY_MAX_PAGES = int(os.getenv('ACTIVITY_MAX_PAGES', '100'))
+
+# LSTM forecasting microservice root
+LSTM_API_BASE = os.getenv('LSTM_API_BASE', "https://lstm-app-708210591622.us-central1.run.app").rstrip("/")
+
+# Keep-alive connection pool size per upstream host
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '32'))
+
+# On-disk incremental issue store (SQLite); set to an empty string to disable persistence
+ISSUE_STORE_PATH = os.getenv('ISSUE_STORE_PATH', os.path.join(tempfile.gettempdir(), 'issue_store.sqlite3'))
+
+# Size bound of the ETag / Last-Modified response cache for GitHub GETs; 0 disables it
+HTTP_CACHE_MAX_BYTES = int(os.getenv('HTTP_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+
+# Repositories compared on the star and fork dashboards, overridable as a comma-separated WATCHLIST_REPOS
+DEFAULT_WATCHLIST = [
+    "ollama/ollama",
+    "langchain-ai/langchain",
+    "langchain-ai/langgraph",
+    "microsoft/autogen",
+    "openai/openai-cookbook",
+    "meta-llama/llama3",
+    "elastic/elasticsearch",
+    "milvus-io/pymilvus"
+]
+DASHBOARD_REPOSITORIES = [repo.strip() for repo in os.getenv('WATCHLIST_REPOS', ','.join(DEFAULT_WATCHLIST)).split(',')
+                          if repo.strip()]
+# How often the background worker refreshes the watchlist stats and charts, in seconds
+WATCHLIST_REFRESH_SECONDS = int(os.getenv('WATCHLIST_REFRESH_SECONDS', '300'))
+
+# Batched repository statistics: repositories per GraphQL query and how long results are reused
+GRAPHQL_BATCH_SIZE = int(os.getenv('GRAPHQL_BATCH_SIZE', '50'))
+REPO_STATS_TTL = int(os.getenv('REPO_STATS_TTL', '300'))
+# Branch head-commit dates kept in process (they never change for a given SHA)
+COMMIT_DATE_CACHE_SIZE = int(os.getenv('COMMIT_DATE_CACHE_SIZE', '100000'))
+
+# Bulk analysis: most repositories per request, and how many are analysed at once per process
+# across all bulk requests
+BULK_MAX_REPOSITORIES = int(os.getenv('BULK_MAX_REPOSITORIES', '50'))
+BULK_CONCURRENCY = int(os.getenv('BULK_CONCURRENCY', '4'))
+
+# LSTM forecast dispatch: seconds each forecast may take and how many run at once per process
+FORECAST_TIMEOUT = float(os.getenv('FORECAST_TIMEOUT', '60'))
+FORECAST_CONCURRENCY = int(os.getenv('FORECAST_CONCURRENCY', '16'))
+
+# Issue forecast payload format: "auto" asks the LSTM service whether it accepts the compact
+# daily series, "compact" always sends it, "legacy" always sends the full issue list
+FORECAST_PAYLOAD_MODE = os.getenv('FORECAST_PAYLOAD_MODE', 'auto')
+# How long the outcome of the capability check is reused, in seconds
+FORECAST_CAPABILITIES_TTL = int(os.getenv('FORECAST_CAPABILITIES_TTL', '600'))
+
+# Forecast engine used when a request doesn't choose one: "remote" (LSTM service), "local"
+# (in-process exponential smoothing) or "auto" (remote within AUTO_FORECAST_TIMEOUT seconds, plus
+# the local forecasts). Local forecasts cover LOCAL_FORECAST_HORIZON months; that many fitted
+# series are cached.
+FORECAST_ENGINE = os.getenv('FORECAST_ENGINE', 'remote')
+AUTO_FORECAST_TIMEOUT = float(os.getenv('AUTO_FORECAST_TIMEOUT', '10'))
+LOCAL_FORECAST_HORIZON = int(os.getenv('LOCAL_FORECAST_HORIZON', '6'))
+LOCAL_FORECAST_CACHE_SIZE = int(os.getenv('LOCAL_FORECAST_CACHE_SIZE', '1024'))
+
+# LSTM results cached by content (SQLite; an empty path disables it): the same inputs are not
+# sent again for FORECAST_CACHE_TTL seconds, and the least recently used entries beyond
+# FORECAST_CACHE_MAX_ENTRIES are evicted
+FORECAST_CACHE_PATH = os.getenv('FORECAST_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'forecast_cache.sqlite3'))
+FORECAST_CACHE_TTL = int(os.getenv('FORECAST_CACHE_TTL', str(6 * 3600)))
+FORECAST_CACHE_MAX_ENTRIES = int(os.getenv('FORECAST_CACHE_MAX_ENTRIES', '10000'))
+
+# LSTM client resilience: connect and read timeouts (seconds); the circuit opens after
+# LSTM_BREAKER_THRESHOLD consecutive failures and lets a trial call through after
+# LSTM_BREAKER_RESET_SECONDS. With LSTM_HEDGE_REQUESTS=1 a call still running after the
+# LSTM_HEDGE_QUANTILE latency of its endpoint is duplicated and the first answer wins.
+LSTM_CONNECT_TIMEOUT = float(os.getenv('LSTM_CONNECT_TIMEOUT', '5'))
+LSTM_READ_TIMEOUT = float(os.getenv('LSTM_READ_TIMEOUT', str(FORECAST_TIMEOUT)))
+LSTM_BREAKER_THRESHOLD = int(os.getenv('LSTM_BREAKER_THRESHOLD', '5'))
+LSTM_BREAKER_RESET_SECONDS = float(os.getenv('LSTM_BREAKER_RESET_SECONDS', '30'))
+LSTM_HEDGE_REQUESTS = os.getenv('LSTM_HEDGE_REQUESTS', '0') == '1'
+LSTM_HEDGE_QUANTILE = float(os.getenv('LSTM_HEDGE_QUANTILE', '0.95'))
+# Latency samples an endpoint needs before its calls are hedged
+LSTM_HEDGE_MIN_SAMPLES = int(os.getenv('LSTM_HEDGE_MIN_SAMPLES', '20'))
+
+# GitHub tokens (comma-separated in GITHUB_TOKEN); calls rotate across them. Without any token
+# requests are sent unauthenticated under GitHub's much lower anonymous limits.
+GITHUB_TOKENS = [token.strip() for token in os.getenv('GITHUB_TOKEN', '').split(',') if token.strip()]
+# Longest a call waits for rate-limit budget before failing fast with a local 429
+RATE_LIMIT_MAX_WAIT = float(os.getenv('RATE_LIMIT_MAX_WAIT', '60'))
+
+# Full /api/github response cache: backend is "memory", "disk", "redis" or "none". Entries are
+# fresh for RESPONSE_CACHE_TTL seconds, then served stale for up to RESPONSE_CACHE_STALE_SECONDS
+# more while a background refresh runs.
+RESPONSE_CACHE_BACKEND = os.getenv('RESPONSE_CACHE_BACKEND', 'memory')
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', '300'))
+RESPONSE_CACHE_STALE_SECONDS = int(os.getenv('RESPONSE_CACHE_STALE_SECONDS', '1800'))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '256'))
+RESPONSE_CACHE_PATH = os.getenv('RESPONSE_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'response_cache.sqlite3'))
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+
+# Response compression: bodies below the threshold (bytes) are sent as they are
+COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', '1024'))
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', '5'))
+
+# Opt-in profiling: with PROFILE_REQUESTS=1, requests sent with `X-Profile: 1` (or `?profile=1`) are
+# run under cProfile and the stats written to PROFILE_DIR; the file is named in X-Profile-File
+PROFILE_REQUESTS = os.getenv('PROFILE_REQUESTS', '0') == '1'
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'profiles'))
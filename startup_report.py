@@ -0,0 +1,45 @@
+# Report the import cost of the app: `python startup_report.py [--top N]`
+#
+# Runs `python -X importtime -c "import app"` in a fresh interpreter and prints the total import
+# time followed by the most expensive modules it imports directly, so releases can be compared.
+import argparse
+import subprocess
+import sys
+
+
+def measure_imports():
+    """Return (total_microseconds, {module: cumulative_microseconds}) for the app's direct imports."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"],
+                            capture_output=True, text=True, check=True)
+    # Children are printed before their parent, one indent level (two spaces) deeper
+    children = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, raw_name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        name = raw_name.strip()
+        level = (len(raw_name) - len(raw_name.lstrip()) - 1) // 2
+        if level == 0:
+            if name == "app":
+                return int(cumulative), dict(children)
+            children = []
+        elif level == 1:
+            children.append((name, int(cumulative)))
+    raise RuntimeError("app was not imported")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    total, modules = measure_imports()
+    print(f"app import time: {total / 1000:.1f} ms")
+    for name, cumulative in sorted(modules.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{cumulative / 1000:10.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
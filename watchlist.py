@@ -0,0 +1,110 @@
+# Background refresh of the watchlist behind /api/stars and /api/forks.
+#
+# A daemon thread per worker process refreshes the star and fork counts of the watchlist and the
+# two bar charts rendered by the LSTM service every WATCHLIST_REFRESH_SECONDS. The endpoints read
+# the latest snapshot from memory and report how old it is.
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from settings import DASHBOARD_REPOSITORIES, WATCHLIST_REFRESH_SECONDS, FORECAST_TIMEOUT
+from repo_stats import fetch_repo_stats
+from lstm_client import lstm
+from forecast_cache import forecast_cache, content_key
+
+
+def post_chart(path, repos_data, url_key):
+    """Ask the LSTM service for a bar chart, unless these counts were charted already; returns its image URL or None."""
+    body = {"repos": repos_data}
+    chart = forecast_cache.fetch(content_key(path, body), lambda: lstm.post_json(path, body, timeout=FORECAST_TIMEOUT))
+    return chart.get(url_key) if isinstance(chart, dict) else None
+
+
+class WatchlistRefresher:
+    def __init__(self, repositories, interval):
+        self.repositories = repositories
+        self.interval = interval
+        self.snapshot = None
+        self._refresh_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def refresh(self, force=False):
+        """Rebuild the snapshot; a chart that fails keeps its previous URL.
+
+        When some counts could not be fetched, the previous snapshot is kept (and returned) as is
+        rather than charting zeros.
+        """
+        with self._refresh_lock:
+            stats, complete = fetch_repo_stats(self.repositories, force=force)
+            if not complete and self.snapshot is not None:
+                print("Watchlist refresh incomplete, keeping the previous snapshot")
+                return self.snapshot
+            names = [repo.split("/")[-1] for repo in self.repositories]
+            repo_stars = [{"name": name, "stars": stats[repo]["stars"]} for name, repo in zip(names, self.repositories)]
+            repo_forks = [{"name": name, "forks": stats[repo]["forks"]} for name, repo in zip(names, self.repositories)]
+
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                star_chart = pool.submit(post_chart, "/api/stars", repo_stars, "star_bar_chart_url")
+                fork_chart = pool.submit(post_chart, "/api/forks", repo_forks, "forks_bar_chart_url")
+
+            previous = self.snapshot or {}
+            self.snapshot = {
+                "stats": stats,
+                "star_bar_chart_url": star_chart.result() or previous.get("star_bar_chart_url"),
+                "forks_bar_chart_url": fork_chart.result() or previous.get("forks_bar_chart_url"),
+                "refreshed_at": time.time()
+            }
+            self._ready.set()
+            return self.snapshot
+
+    def run(self):
+        while True:
+            # Forced refreshes push the next scheduled one back
+            snapshot = self.snapshot
+            delay = snapshot["refreshed_at"] + self.interval - time.time() if snapshot else 0
+            if delay > 0:
+                time.sleep(delay)
+                continue
+            try:
+                if self.refresh(force=True) is snapshot:
+                    # Kept because GitHub lookups failed; retry sooner than the next interval
+                    time.sleep(min(self.interval, 30))
+            except Exception as error:
+                print(f"Watchlist refresh failed: {error}")
+                time.sleep(min(self.interval, 30))
+
+    def ensure_started(self):
+        """Start the worker thread once per process (threads do not survive a fork)."""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self._thread = threading.Thread(target=self.run, name="watchlist-refresh", daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def current(self):
+        """Latest snapshot; only the very first requests wait for the initial refresh."""
+        self.ensure_started()
+        if self.snapshot is None:
+            self._ready.wait(timeout=2 * FORECAST_TIMEOUT)
+        return self.snapshot or self.refresh()
+
+    def request_refresh(self):
+        """Refresh right now, bypassing the stats cache."""
+        self.ensure_started()
+        return self.refresh(force=True)
+
+    def staleness(self, snapshot):
+        return {
+            "refreshed_at": datetime.fromtimestamp(snapshot["refreshed_at"], timezone.utc).isoformat(),
+            "stale_seconds": round(time.time() - snapshot["refreshed_at"], 1)
+        }
+
+
+watchlist = WatchlistRefresher(DASHBOARD_REPOSITORIES, WATCHLIST_REFRESH_SECONDS)